@@ -17,6 +17,9 @@ EXPORT_SERVER_ONLY = [
 
 ]
 
+# Only re-export the excel files changed since the last export, state is kept in the out folder 增量导出,只重新导出上次导出后修改过的配置文件
+INCREMENTAL_EXPORT = True
+
 # do not modify the following
 
 import os
@@ -31,12 +34,20 @@ pythonpath = 'tools\\py37\\py37.exe ' if platform.system() == 'Windows' else 'py
 class ExportError(Exception):
   pass
 
-def export(filelist, format, sign, outfolder, suffix, schema):
-  cmd = r' -p "' + ','.join(filelist) + '" -f ' + outfolder + ' -e ' + format + ' -s ' + sign
+def target(filelist, format, sign, outfolder, suffix, schema):
+  args = "-p '" + ','.join(filelist) + "' -f " + outfolder + ' -e ' + format + ' -s ' + sign
   if suffix:
-    cmd += ' -t ' + suffix
+    args += ' -t ' + suffix
   if schema:
-    cmd += ' -c ' + schema
+    args += ' -c ' + schema
+  return args
+
+def export(targets):
+  cmd = ''
+  for args in targets:
+    cmd += ' -o "' + args + '"'
+  if INCREMENTAL_EXPORT:
+    cmd += ' -i'
   cmd = pythonpath + exportscript + cmd
   code = os.system(cmd)
   if code != 0:
@@ -52,18 +63,20 @@ def codegenerator(schema, outfolder, namespace, suffix):
     if code != 0:
       raise ExportError('codegenerator fail, please see print')
         
-def exportclient():
-  export(EXPORT_FILES + EXPORT_CLIENT_ONLY, 'json', 'client', 'config_client', 'Config', 'schemaserver.json')
+def clienttarget():
+  return target(EXPORT_FILES + EXPORT_CLIENT_ONLY, 'json', 'client', 'config_client', 'Config', 'schemaserver.json')
 
-    
-def exportserver():
-  export(EXPORT_FILES + EXPORT_SERVER_ONLY, 'lua', 'server', 'config_server', '', None)
+def servertarget():
+  return target(EXPORT_FILES + EXPORT_SERVER_ONLY, 'lua', 'server', 'config_server', '', None)
+  
+def exportall():
+  # one proton run for both, every excel file is parsed once 
+  export([servertarget(), clienttarget()])
   #codegenerator('schemaserver.json', 'config_server/ConfigGenerator/Template', 'Ice.Project.Config', 'Template')
   
 def main():
   try:
-    exportserver()
-    exportclient()
+    exportall()
     print("all operation finish successful")
     return 0
   except ExportError as e:
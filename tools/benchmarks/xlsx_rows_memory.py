@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark of the xlsx worksheet parsers of the vendored xlrd.
+
+Builds worksheets of 5 number cells per row in memory and reads each one
+with a column_filter that skips every cell, so the sheet itself stays
+empty and what is measured is the memory held by the parser. The peak is
+taken with tracemalloc, after a first read of a small sheet with the same
+options, so that one-time costs (lazy imports, compiled patterns) are not
+counted in the first row count.
+
+    python tools/benchmarks/xlsx_rows_memory.py [rows ...]
+
+The default row counts are 50000 100000 300000. Reading is several times
+slower under tracemalloc, the default run takes a few minutes.
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py37'))
+import xlrd
+
+MODES = (
+    ('default', {}),
+    ('detach_rows', {'detach_rows': True}),
+    ('use_expat', {'use_expat': True}),
+)
+
+NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+RELS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+DOC_RELS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+
+def make_book(nrows):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="%s">'
+             '<dimension ref="A1:E%d"/><sheetData>' % (NS, nrows)]
+    for r in range(1, nrows + 1):
+        parts.append('<row r="%d" spans="1:5">' % r)
+        parts.extend('<c r="%s%d"><v>%d</v></c>' % (c, r, r * 7 + i) for i, c in enumerate('ABCDE'))
+        parts.append('</row>')
+    parts.append('</sheetData></worksheet>')
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml',
+                    '<?xml version="1.0" encoding="UTF-8"?>'
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>')
+        zf.writestr('xl/workbook.xml',
+                    '<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="%s" xmlns:r="%s">'
+                    '<sheets><sheet name="s" sheetId="1" r:id="rId1"/></sheets></workbook>' % (NS, DOC_RELS))
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="%s">'
+                    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+                    'Type="%s/worksheet"/></Relationships>' % (RELS, DOC_RELS))
+        zf.writestr('xl/worksheets/sheet1.xml', ''.join(parts))
+    return stream.getvalue()
+
+
+def skip_cells(sheet, rowx):
+    return ()
+
+
+def read(contents, options):
+    return xlrd.open_workbook(file_contents=contents, column_filter=skip_cells, **options)
+
+
+def main(counts):
+    books = [(nrows, make_book(nrows)) for nrows in counts]
+    warmup = make_book(100)
+    print('%-12s %10s %12s %10s' % ('mode', 'rows', 'peak', 'time'))
+    for name, options in MODES:
+        read(warmup, options)
+        for nrows, contents in books:
+            tracemalloc.start()
+            start = time.time()
+            read(contents, options)
+            elapsed = time.time() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('%-12s %10d %9.2f MB %9.1fs' % (name, nrows, peak / 1e6, elapsed))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [50000, 100000, 300000])
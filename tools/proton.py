@@ -24,14 +24,22 @@ if sys.version_info < (3, 0):
 import os
 import string
 import collections
+import itertools
 import codecs
 import getopt
+import shlex
+import copy
 import re
 import json
-import xml.etree.ElementTree as ElementTree
-import xml.dom.minidom as minidom
+import hashlib
+import marshal
+import types
+import multiprocessing
 import xlrd
 
+HEADINGROWS = 4     # description, type, name and sign rows of a item sheet
+STREAMMAXMERGEDROWS = 1024    # a item sheet with taller merged cells is loaded, not streamed
+
 def fillvalue(parent, name, value, isschema):
   if isinstance(parent, list):
     parent.append(value) 
@@ -71,9 +79,20 @@ def issignmatch(signarg, sign):
     return True
   return True if [s for s in re.split(r'[/\\, :]', sign) if s in signarg] else False
 
-def isoutofdate(srcfile, tarfile):
-  return True;
-  # return not os.path.isfile(tarfile) or os.path.getmtime(srcfile) > os.path.getmtime(tarfile)
+def hashfile(path):
+  sha1 = hashlib.sha1()
+  with open(path, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 16), b''):
+      sha1.update(chunk)
+  return sha1.hexdigest()
+
+def hashsources():
+  '''the hash of proton.py and of the xlrd package that reads the excel files, the exported and cached data depend on both'''
+  sha1 = hashlib.sha1()
+  folder = os.path.dirname(xlrd.__file__)
+  for path in [__file__] + sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.py')):
+    sha1.update(hashfile(path).encode('ascii'))
+  return sha1.hexdigest()
 
 def gerexportfilename(root, format_, folder):
   filename = root +  '.' + format_
@@ -82,81 +101,395 @@ def gerexportfilename(root, format_, folder):
 def splitspace(s):
   return re.split(r'[' + string.whitespace + ']+', s.strip())
 
-def buildbasexml(parent, name, value):
-  value = str(value)
-  if parent.tag == name + 's':
-    element = ElementTree.Element(name)
-    element.text = value
-    parent.append(element)
+def splitpaths(path):
+  return [p for p in re.split(r'[,;|]+', path.strip()) if p]
+  
+def splitargs(s):
+  lexer = shlex.shlex(s, posix = True)
+  lexer.whitespace_split = True
+  lexer.escape = ''       # keep the windows path separator
+  return list(lexer)
+  
+def isconfigsheet(sheet):
+  return isconfigtitles(sheet.row_values(0) if sheet.nrows else [])
+  
+def isconfigtitles(titles):
+  return all(getindex(titles, title) != -1 for title in Exporter.configsheettitles[:3])
+
+def loadedsheets(data):
+  return [data.sheet_by_index(sheetx) for sheetx in range(data.nsheets) if data.sheet_loaded(sheetx)]
+
+def stopatdataend(stops):
+  '''the stop_row of xlrd, a item sheet is not read after spacemaxrowcount empty rows,
+  these are formatted rows in most cases. the row count read of each stopped sheet is put in stops'''
+  states = {}     # sheet name : [last row index, empty row count, is config sheet]
+  def stop(sheet, rowx):
+    if rowx < HEADINGROWS:
+      return False
+    state = states.get(sheet.name)
+    if state is None:
+      state = states[sheet.name] = [HEADINGROWS - 1, 0, isconfigsheet(sheet)]
+    if state[2]:
+      return False
+    emptyrows = state[1] + rowx - state[0] - 1      # the rows between are not in the sheet
+    if emptyrows < Exporter.spacemaxrowcount:
+      emptyrows = 0 if rowx < sheet.nrows else emptyrows + 1
+    state[0] = rowx
+    state[1] = emptyrows
+    if emptyrows >= Exporter.spacemaxrowcount:
+      stops[sheet.name] = rowx + 1
+      return True
+    return False
+  return stop
+  
+def getsigncolumns(sheet, signs):
+  if sheet.nrows < HEADINGROWS or isconfigsheet(sheet):
+    return None
+  # the columns after it have no type. merged title cells have no stored cells after their first column,
+  # so the width recorded in the file is taken when it is wider, the empty signs of these columns are kept
+  width = max([sheet.row_len(r) for r in range(1, HEADINGROWS)] + [getattr(sheet, '_dimncols', 0)])
+  signrow = sheet.row_values(HEADINGROWS - 1)
+  columns = set([0])
+  for colindex in range(1, width):
+    sign = str(signrow[colindex]).strip() if colindex < len(signrow) else ''
+    if any(issignmatch(s, sign) for s in signs):
+      columns.add(colindex)
+  return columns
+  
+def selectcolumns(signs, selected):
+  '''the column_filter of xlrd, the data rows of a item sheet are only read in the first column
+  and the columns of the signs. the columns selected for each sheet are put in selected'''
+  def select(sheet, rowx):
+    if rowx < HEADINGROWS:
+      return None
+    if sheet.name not in selected:
+      selected[sheet.name] = getsigncolumns(sheet, signs)
+    return selected[sheet.name]
+  return select
+  
+def hasmergedcolumns(sheet, columns):
+  '''whether the columns read include the merged columns of the list, obj and map columns, 
+  a merged sign is empty in the columns after the first one, in the other case they are not read'''
+  if columns is None:
+    return True
+  for colindex in columns:
+    crange = sheet.merged_range(HEADINGROWS - 1, colindex)
+    if crange and crange[2] == colindex and crange[3] > colindex + 1:
+      width = 3 if str(sheet.cell_value(1, colindex)).strip() == 'map' else 2
+      if any(c not in columns for c in range(colindex + 1, colindex + width)):
+        return False
+  return True
+
+def hasdatarows(sheet):
+  '''whether a item sheet read with headings has data rows, one of the rows read after the title rows has a first cell'''
+  return any(str(sheet.cell_value(rowx, 0)).strip() for rowx in range(HEADINGROWS, min(sheet.nrows, HEADINGROWS + Exporter.spacemaxrowcount)))
+
+def isdataend(sheet, endrow):
+  '''whether exportitemsheet stops before endrow, so the rows after it are not needed'''
+  spacerowcount = 0
+  rowindex = HEADINGROWS
+  while rowindex < endrow:
+    if rowindex < sheet.nrows and str(sheet.cell_value(rowindex, 0)).strip():
+      spacerowcount = 0
+    else:
+      spacerowcount += 1
+      if spacerowcount >= Exporter.spacemaxrowcount:
+        return True
+    rowindex += cell_size(rowindex, 0, sheet)[0]
+  return False
+
+def openstreamsheet(path, data, sheetx, signs):
+  '''returns a StreamSheet of a item sheet of a xlsx file, None when the sheet is loaded instead:
+  it is a config sheet, or its merged cells are taller than STREAMMAXMERGEDROWS'''
+  rows = data.iter_sheet_rows(sheetx)
+  if data.sheet_loaded(sheetx):     # not a xlsx file, the rows are from the loaded sheet
+    return None
+  if any(crange[1] - crange[0] > STREAMMAXMERGEDROWS for crange in rows.merged_cells):
+    rows.close()
+    return None
+  rowsiter = iter(rows)
+  titles = [next(rowsiter, []) for i in range(HEADINGROWS)]
+  if rows.nrows < HEADINGROWS or isconfigtitles(titles[0]):
+    rows.close()
+    return None
+  sheet = StreamSheet(path, data, sheetx, rows, rowsiter, titles)
+  if None not in signs:
+    columns = getsigncolumns(sheet, signs)
+    for rlo, rhi, clo, chi in rows.merged_cells:    # the merged list, obj and map columns are read whole
+      if rlo < HEADINGROWS <= rhi and clo in columns:
+        columns.update(range(clo, chi))
+    sheet.columns = columns
+  return sheet
+  
+def closesheets(sheets):
+  for sheet in sheets:
+    if isinstance(sheet, StreamSheet):
+      sheet.close()
+
+def openbook(path, headings = False, signs = (None,), cache = None):
+  '''returns the export sheets of the excel file, only used strings are decoded, 
+  the styles are only scanned for the date formats, comments and document properties are not read.
+  the rows after the data of the item sheets are not read, and only the columns of the signs in them,
+  with headings only their title rows and the rows after them up to spacemaxrowcount are read. config sheets are always read whole.
+  the item sheets of a xlsx file exported by one target are streamed, call closesheets after the export.
+  with more targets they are loaded, so each sheet is parsed once for all of them.
+  with a BookCache the sheets are loaded from it when the file was read before with the same options'''
+  if cache:
+    sheets = cache.load(path, headings, signs)
+    if sheets is None:
+      sheets = readbook(path, headings, signs, False)
+      cache.save(path, headings, signs, sheets)
+    return sheets
+  return readbook(path, headings, signs, len(signs) == 1)
+
+def readbook(path, headings, signs, stream):
+  if headings:
+    sheets = loadedsheets(xlrd.open_workbook(path, sheet_filter = getexportmark, lazy_sst = True, minimal_metadata = True, max_rows = HEADINGROWS + Exporter.spacemaxrowcount))
+    names = set(sheet.name for sheet in sheets if sheet.nrows >= HEADINGROWS and isconfigsheet(sheet))
   else:
-    parent.set(name, value)    
-            
-def buildlistxml(parent, name, list_):
-  element = ElementTree.Element(name)
-  parent.append(element)
-  for v in list_:
-    buildxml(element, name[:-1], v)    
-
-def buildobjxml(parent, name, obj):
-  element = ElementTree.Element(name)
-  parent.append(element)
+    stops = {}
+    selected = {}
+    columnfilter = None if None in signs else selectcolumns(signs, selected)
+    data = xlrd.open_workbook(path, on_demand = True, lazy_sst = True, minimal_metadata = True, stop_row = stopatdataend(stops), column_filter = columnfilter)
+    sheets = []
+    for sheetx, name in enumerate(data.sheet_names()):
+      if getexportmark(name):
+        sheet = openstreamsheet(path, data, sheetx, signs) if stream else None
+        sheets.append(sheet or data.sheet_by_index(sheetx))
+    if not any(isinstance(sheet, StreamSheet) for sheet in sheets):
+      data.release_resources()
+    names = set(sheet.name for sheet in sheets if not isinstance(sheet, StreamSheet) and (
+      (sheet.name in stops and not isdataend(sheet, stops[sheet.name]))    # the empty rows are in merged items
+      or not hasmergedcolumns(sheet, selected.get(sheet.name))))
+  if names:
+    wholesheets = loadedsheets(xlrd.open_workbook(path, sheet_filter = lambda name: name in names, lazy_sst = True, minimal_metadata = True))
+    sheets = [wholesheets.pop(0) if sheet.name in names else sheet for sheet in sheets]
+  return sheets
+
+def trimrow(row):
+  end = len(row)
+  while end and row[end - 1] == '':
+    end -= 1
+  return row[:end]
+
+def getcache(context):
+  return BookCache(context.cache) if context.cache else None
+
+class BookCache:
+  '''the sheets read by openbook kept in a folder, one marshal file for each excel file and read options,
+  keyed by the hash of the excel file. the least recently used files are removed when the folder is over maxsize'''
+  version = 1
+  maxsize = 256 << 20
+  extension = '.sheets'
   
-  for k, v in obj.items():
-    buildxml(element, k, v)
-        
-def buildxml(parent, name, value):
-  if isinstance(value, int) or isinstance(value, float) or isinstance(value, str):
-    buildbasexml(parent, name, value)
-      
-  elif isinstance(value, list):
-    buildlistxml(parent, name, value)
-      
-  elif isinstance(value, dict):
-    buildobjxml(parent, name, value)
+  def __init__(self, folder):
+    self.folder = folder
+    self.sources = hashsources()
+    
+  def getfilename(self, path, headings, signs):
+    key = json.dumps([self.version, marshal.version, self.sources, hashfile(path), headings, sorted(set(json.dumps(s) for s in signs))])
+    return os.path.join(self.folder, hashlib.sha1(key.encode('utf-8')).hexdigest() + self.extension)
+    
+  def load(self, path, headings, signs):
+    filename = self.getfilename(path, headings, signs)
+    try:
+      with open(filename, 'rb') as f:
+        data = marshal.loads(f.read())
+      os.utime(filename)      # marks it as used for evict
+    except (IOError, ValueError, EOFError, TypeError):
+      return None
+    return [CachedSheet(*sheet) for sheet in data]
+    
+  def save(self, path, headings, signs, sheets):
+    data = [(sheet.name, sheet.ncols, sheet.merged_cells, [trimrow(sheet.row_values(rowx)) for rowx in range(sheet.nrows)]) for sheet in sheets]
+    filename = self.getfilename(path, headings, signs)
+    temp = '%s.%d.tmp' % (filename, os.getpid())     # other processes may read or write the same file
+    os.makedirs(self.folder, exist_ok = True)
+    with open(temp, 'wb') as f:
+      f.write(marshal.dumps(data))
+    os.replace(temp, filename)
+    
+  def evict(self):
+    try:
+      names = [name for name in os.listdir(self.folder) if name.endswith(self.extension)]
+    except OSError:
+      return
+    files = []
+    for name in names:
+      filename = os.path.join(self.folder, name)
+      try:
+        stat = os.stat(filename)
+      except FileNotFoundError:     # removed by another process since listed
+        continue
+      files.append((stat.st_mtime, stat.st_size, filename))
+    size = sum(f[1] for f in files)
+    for mtime, filesize, filename in sorted(files):
+      if size <= self.maxsize:
+        break
+      try:
+        os.remove(filename)
+      except FileNotFoundError:
+        pass
+      size -= filesize
+
+def escapexml(value):
+  return value.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+  
+def checkxmlname(name):
+  if not isinstance(name, str):
+    raise TypeError('cannot serialize %r (type %s)' % (name, type(name).__name__))
+  if not re.match(r'^[^\W\d][\w.-]*$', name):
+    raise ValueError('%r is a illegal xml name' % name)
+    
+def getxmlnodes(name, value):
+  '''split value into the attributes and the child elements of the element name,
+  a base value is a child element only when name is its plural name, a list element uses the singular name for its items'''
+  attributes = collections.OrderedDict()
+  children = []
+  items = ((name[:-1], v) for v in value) if isinstance(value, list) else value.items()
+  for k, v in items:
+    if isinstance(v, int) or isinstance(v, float) or isinstance(v, str):
+      if name == k + 's':
+        children.append((k, str(v)))
+      else:
+        checkxmlname(k)
+        attributes[k] = str(v)      # the last value wins for a repeated attribute
+    elif isinstance(v, list) or isinstance(v, dict):
+      children.append((k, v))
+  if sys.version_info < (3, 8):     # xml libraries sort the attributes before python 3.8
+    attributes = collections.OrderedDict(sorted(attributes.items()))
+  return attributes, children
+  
+def toxml(name, value, indent = ''):
+  checkxmlname(name)
+  if isinstance(value, str):
+    value = value.replace('\r\n', '\n').replace('\r', '\n')
+    yield indent + ('<%s>%s</%s>\n' % (name, escapexml(value), name) if value else '<%s/>\n' % name)
+    return
+    
+  attributes, children = getxmlnodes(name, value)
+  yield indent + '<' + name
+  for k, v in attributes.items():
+    yield ' %s="%s"' % (k, escapexml(v))
+  if not children:
+    yield '/>\n'
+    return
+  yield '>\n'
+  for k, v in children:
+    for part in toxml(k, v, indent + '  '):
+      yield part
+  yield indent + '</' + name + '>\n'
             
 def savexml(record):
-  book = ElementTree.ElementTree()
-  book.append = lambda e: book._setroot(e)
-  buildxml(book, record.root, record.obj)
-  
-  xmlstr = ElementTree.tostring(book.getroot(), 'utf-8')
-  dom = minidom.parseString(xmlstr)
-  with codecs.open(record.exportfile, 'w', 'utf-8') as f:
-    dom.writexml(f, '', '  ', '\n', 'utf-8')
+  try:
+    with codecs.open(record.exportfile, 'w', 'utf-8') as f:
+      f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+      writeparts(f, toxml(record.root, record.obj))
+  except Exception:
+    os.remove(record.exportfile)      # do not leave a partial file
+    raise
       
-  print('save %s from %s in %s' % (record.exportfile, record.sheet.name, record.path))
+  print('save %s from %s in %s' % (record.exportfile, record.sheetname, record.path))
   
 def newline(count):
   return '\n' + '  ' * count
   
-def tolua(obj, indent = 1):    
-  if isinstance(obj, int) or isinstance(obj, float) or isinstance(obj, str):
-    yield json.dumps(obj, ensure_ascii = False)
+jsonencoder = json.JSONEncoder(ensure_ascii = False)
+
+def tojsonkey(k):
+  return jsonencoder.encode(k if isinstance(k, str) else jsonencoder.encode(k))     # json object key is always a string
+  
+def tojson(obj, indent = 2, level = 1):
+  '''the same text as json.dumps(obj, ensure_ascii = False, indent = indent), 
+  indent None is the compact text without spaces'''
+  isdict = isinstance(obj, dict)
+  if not isdict and not isinstance(obj, list):
+    yield jsonencoder.encode(obj)
+  elif not obj:
+    yield '{}' if isdict else '[]'
   else:
-    yield '{'
-    islist = isinstance(obj, list)
+    yield '{' if isdict else '['
+    linebreak = '\n' + ' ' * (indent * level) if indent is not None else ''
     isfirst = True
     for i in obj:
       if isfirst:
         isfirst = False
       else:
         yield ','
-      yield newline(indent)
-      if not islist:
-        k = i
-        i = obj[k]
-        keyname = ""
-        if isinstance(k, str):
-          keyname = str(k)
-        else:
-          keyname = '[' +str(k) + ']'
-
-        yield keyname 
-        yield ' = '                
-      for part in tolua(i, indent + 1):
+      yield linebreak
+      if isdict:
+        yield tojsonkey(i)
+        yield ': ' if indent is not None else ':'
+        i = obj[i]
+      for part in tojson(i, indent, level + 1):
         yield part
-    yield newline(indent - 1)
-    yield '}'
+    if indent is not None:
+      yield '\n' + ' ' * (indent * (level - 1))
+    yield '}' if isdict else ']'
+    
+def writeparts(f, parts, size = 4096):
+  '''write the text parts in batches, only one batch is kept in memory'''
+  buffer = []
+  for part in parts:
+    buffer.append(part)
+    if len(buffer) >= size:
+      f.write(''.join(buffer))
+      buffer = []
+  f.write(''.join(buffer))
+  
+def toluavalue(value):
+  if isinstance(value, str):
+    return json.encoder.encode_basestring(value)
+  if isinstance(value, bool):
+    return 'true' if value else 'false'
+  if isinstance(value, int):
+    return int.__repr__(value)
+  return jsonencoder.encode(value)
+  
+def writelua(f, obj, size = 4096):
+  '''write obj as a lua table, a explicit stack is used instead of recursion, 
+  the text parts are written in batches of size'''
+  parts = []
+  newlines = ['\n']      # newlines[n] is newline(n)
+  stack = []              # [iterator, table, islist, isfirst]
+  value = obj
+  while True:
+    if isinstance(value, (int, float, str)):
+      parts.append(toluavalue(value))
+    else:
+      parts.append('{')
+      stack.append([iter(value), value, isinstance(value, list), True])
+      if len(newlines) <= len(stack):
+        newlines.append(newlines[-1] + '  ')
+        
+    if len(parts) >= size:
+      f.write(''.join(parts))
+      parts = []
+        
+    while stack:
+      frame = stack[-1]
+      k = next(frame[0], stack)       # the stack is the end sentinel
+      if k is stack:
+        stack.pop()
+        parts.append(newlines[len(stack)])
+        parts.append('}')
+        continue
+        
+      if frame[3]:
+        frame[3] = False
+      else:
+        parts.append(',')
+      parts.append(newlines[len(stack)])
+      if frame[2]:
+        value = k
+      else:
+        parts.append(k if isinstance(k, str) else '[' + str(k) + ']')
+        parts.append(' = ')
+        value = frame[1][k]
+      break
+    else:
+      break
+  f.write(''.join(parts))
     
 def toycl(obj, indent = 0):
   islist = isinstance(obj, list)
@@ -181,69 +514,130 @@ def toycl(obj, indent = 0):
 
 
 def cell_real_value(row, col, sheet):
-  for merged in sheet.merged_cells:
-    if (row <= merged[0] and row < merged[1] and col >= merged[2] and col < merged[3]):
-      return sheet.cell_value(merged[0], merged[2]);
+  merged = sheet.merged_range(row, col)
+  if merged:
+    return sheet.cell_value(merged[0], merged[2])
   return sheet.cell_value(row, col)
 
 def cell_size(row, col, sheet):
-  for merged in sheet.merged_cells:
-    if (row >= merged[0] and row < merged[1] and col >= merged[2] and col < merged[3]):
-      return (merged[1] - merged[0], merged[3] - merged[2])
-  return (1, 1)
+  return sheet.merged_span(row, col)
 
-def get_type_value(typename, value):
-  if typename == 'int':
-    value = int(float(value))
-  elif typename == 'double':
-    value = float(value)   
-  elif typename == 'string':
-    if value.endswith('.0'):          # may read is like "123.0"
-      try:
-        value = str(int(float(value)))
-      except ValueError:
-        value = str(value)
-    else:            
-      value = str(value)
-  elif typename == 'bool':
+def tointvalue(value):
+  return int(float(value))
+
+def tostringvalue(value):
+  if value.endswith('.0'):          # may read is like "123.0"
     try:
-      value = int(float(value))
-      value = False if value == 0 else True 
+      return str(int(float(value)))
     except ValueError:
-      value = value.lower() 
-      if value in ('false', 'no', 'off'):
-        value = False
-      elif value in ('true', 'yes', 'on'):
-        value = True
-      else:    
-        raise ValueError('%s is a illegal bool value' % value)
-
-  return str(value) 
-
-def get_obj_str_value(obj, type_):
-  fieldname = type_.strip('{}[]')
-  if fieldname == '':
-    return ''
-  fieldnamestypes = fieldname.split(':')
-  retvalue = ""
-  for i in range(0, len(fieldnamestypes)):
-    fieldtype, fieldname = splitspace(fieldnamestypes[i])
-    fieldValue = ""
-    if fieldname in obj.keys():
-      fieldValue = get_type_value(fieldtype, obj[fieldname])
-    if retvalue != "":
-      retvalue = retvalue + ":"
-    retvalue = retvalue + fieldValue
-
-  return retvalue    
+      pass
+  return str(value)
+
+def toboolvalue(value):
+  try:
+    value = int(float(value))
+    return False if value == 0 else True 
+  except ValueError:
+    value = value.lower() 
+    if value in ('false', 'no', 'off'):
+      return False
+    elif value in ('true', 'yes', 'on'):
+      return True
+    else:    
+      raise ValueError('%s is a illegal bool value' % value)
+
+basetypeconverters = {
+  'int' : tointvalue,
+  'double' : float,
+  'string' : tostringvalue,
+  'bool' : toboolvalue,
+}
 
 def get_obj_type_first_field(type_):
   fieldnamestypes = type_.strip('{}').split(':')
   fieldtype, fieldname = splitspace(fieldnamestypes[0])
   return fieldname
 
+def exportbookworker(task):
+  '''runs in a pool process, export one excel file for the targets that need it'''
+  path, settings = task
+  cache = getcache(types.SimpleNamespace(**settings[0]))
+  data = openbook(path, all(setting['headings'] for setting in settings), [setting['sign'] for setting in settings], cache)
+  results = []
+  for setting in settings:
+    exporter = Exporter(types.SimpleNamespace(**setting))
+    error = None
+    try:
+      exporter.exportbook(path, data)
+    except Exception as e:
+      error = e               # the parent reports it after the records exported before it
+    for r in exporter.records:
+      r.sheet = None          # xlrd sheet is not sent back
+    results.append((exporter.records, exporter.constraints, error))
+    if error:
+      break
+  closesheets(data)
+  return results
+  
+def exporttargets(exporters, jobs = 1):
+  '''export all targets in one pass, each excel file is parsed once and shared by the targets that export it'''
+  paths = []
+  for exporter in exporters:
+    exporter.prepare()
+    for path in exporter.paths:
+      if path not in paths:
+        paths.append(path)
+        
+  cache = getcache(exporters[0].context)
+  if jobs > 1:
+    exportparallel(exporters, paths, jobs)
+  else:
+    exportserial(exporters, paths, cache)
+  if cache:
+    cache.evict()
+    
+def exportserial(exporters, paths, cache):
+  for path in paths:
+    pending = [exporter for exporter in exporters if path in exporter.paths and not exporter.skipbook(path)]
+    if pending:
+      data = openbook(path, all(exporter.context.headings for exporter in pending), [exporter.context.sign for exporter in pending], cache)
+      try:
+        for exporter in pending:
+          exporter.exportbook(path, data)
+      finally:
+        closesheets(data)
+        
+  for exporter in exporters:
+    exporter.finish()
+    
+def exportparallel(exporters, paths, jobs):
+  '''the excel files are parsed and exported in a process pool, 
+  the results are merged in path order, so the records, the checks and the errors are the same as a serial export'''
+  pendings = collections.OrderedDict()
+  for path in paths:
+    pending = [exporter for exporter in exporters if path in exporter.paths and path not in exporter.unchanged]
+    if pending:
+      pendings[path] = pending
+      
+  tasks = [(path, [exporter.getsettings() for exporter in pending]) for path, pending in pendings.items()]
+  with multiprocessing.Pool(min(jobs, len(tasks)) or 1) as pool:
+    results = pool.imap(exportbookworker, tasks)
+    for path in paths:
+      for exporter in exporters:
+        if path in exporter.paths:
+          exporter.skipbook(path)
+      if path in pendings:
+        for exporter, (records, constraints, error) in zip(pendings[path], next(results)):
+          exporter.path = path
+          exporter.mergebook(records, constraints)
+          if error:
+            raise error
+          
+  for exporter in exporters:
+    exporter.finish()
+
 def exportexcel(context):
-  Exporter(context).export()
+  exporttargets([Exporter(target) for target in context.targets], context.jobs)
   print("export finsish successful!!!")
     
 class BindType:
@@ -257,21 +651,238 @@ class Record:
   def __init__(self, path, sheet, exportfile, root, item, obj, exportmark):
     self.path = path 
     self.sheet = sheet 
+    self.sheetname = sheet.name if sheet else None
     self.exportfile = exportfile 
     self.root = root 
     self.item = item
     self.setobj(obj)
     self.exportmark = exportmark
+    self.unchanged = False    # restored from the manifest, the export file is up to date
+    self.hash = None
 
   def setobj(self, obj):    
     self.schema = obj[0] if obj else None
     self.obj = obj[1] if obj else None
+    
+class Manifest:
+  '''the excel and export file hashes of the last export, kept in the out folder.
+  each target has its own manifest file, named by the hash of its settings, so targets that share a folder keep theirs'''
+  filename = '.proton_manifest_%s.json'
+  version = 2
+  
+  def __init__(self, context):
+    target = { 
+      'sign' : context.sign, 
+      'format' : context.format, 
+      'extension' : context.extension, 
+      'codegenerator' : bool(context.codegenerator),
+      'compact' : context.compact,
+    }
+    key = hashlib.sha1(json.dumps(target, sort_keys = True).encode('utf-8')).hexdigest()[:12]
+    self.path = os.path.join(context.folder, self.filename % key)
+    self.settings = dict(target, version = self.version, proton = hashsources())
+    self.books = {}
+    self.hashes = {}
+    try:
+      with codecs.open(self.path, 'r', 'utf-8') as f:
+        data = json.load(f, object_pairs_hook = collections.OrderedDict)
+      if data['settings'] == self.settings:
+        self.books = data['books']
+    except (IOError, ValueError, KeyError):
+      pass
+      
+  def gethash(self, path):
+    h = self.hashes.get(path)
+    if h is None:
+      h = hashfile(path)
+      self.hashes[path] = h
+    return h
+    
+  def isunchanged(self, path):
+    book = self.books.get(path)
+    if not book or book['hash'] != self.gethash(path):
+      return False
+    for r in book['records']:
+      if r['hash'] and (not os.path.isfile(r['exportfile']) or hashfile(r['exportfile']) != r['hash']):
+        return False
+    return True
+    
+  def getunchanged(self, paths):
+    unchanged = set(path for path in paths if self.isunchanged(path))
+    providers = {}      # mark : path
+    for path, book in self.books.items():
+      for r in book['records']:
+        providers.setdefault(r['exportmark'], path)
+        if r['item']:
+          providers.setdefault(r['item'], path)
+          
+    # a book whose constraints point at a changed book must be checked again 
+    changed = True
+    while changed:
+      changed = False
+      for path in list(unchanged):
+        if any(providers.get(mark) not in unchanged for mark in self.books[path]['depends']):
+          unchanged.remove(path)
+          changed = True
+    return unchanged
+    
+  def getrecords(self, path):
+    return self.books[path]['records']
+    
+  def save(self, paths, unchanged, records, constraints):
+    books = collections.OrderedDict()
+    for path in paths:
+      book = collections.OrderedDict()
+      book['hash'] = self.gethash(path)
+      book['records'] = []
+      if path in unchanged:
+        book['depends'] = self.books[path]['depends']
+      else:
+        book['depends'] = sorted(set(c.mark for c in constraints if c.path == path))
+      books[path] = book
+      
+    for r in records:
+      info = collections.OrderedDict()
+      info['root'] = r.root
+      info['item'] = r.item
+      info['exportmark'] = r.exportmark
+      info['exportfile'] = r.exportfile
+      info['schema'] = r.schema
+      if r.path in unchanged:
+        info['hash'] = r.hash
+      else:
+        info['hash'] = hashfile(r.exportfile) if r.obj else None
+      books[r.path]['records'].append(info)
+      
+    if not os.path.isdir(os.path.dirname(self.path) or '.'):
+      os.makedirs(os.path.dirname(self.path))
+    data = collections.OrderedDict()
+    data['settings'] = self.settings
+    data['books'] = books
+    with codecs.open(self.path, 'w', 'utf-8') as f:
+      f.write(json.dumps(data, ensure_ascii = False, indent = 2))
         
+class Column:
+  def __init__(self, index, type_, name, signmatch, width):
+    self.index = index
+    self.type_ = type_
+    self.name = name
+    self.signmatch = signmatch
+    self.width = width        # merged width of the sign title cell
+    self.typename = None      # gettype result, a BindType carries the constraint
+    self.build = None         # compiled builder, see Exporter.getexpress
+    self.firstfield = None    # first field name of a merged obj list
+    
 class Constraint:
   def __init__(self, mark, filed):
     self.mark = mark
     self.field = filed     
         
+class StreamSheet:
+  '''a item sheet of a xlsx file exported from its rows in order as they are read, only its title rows are kept.
+  the export reads on from the title rows, a sheet exported again is read again from the open book'''
+  def __init__(self, path, data, sheetx, rows, rowsiter, titles):
+    self.path = path
+    self.data = data
+    self.sheetx = sheetx
+    self.name = rows.name
+    self.rows = rows
+    self.rowsiter = rowsiter
+    self.titles = titles
+    self.nrows = len(titles)
+    self.ncols = max([len(row) for row in titles] + [crange[3] for crange in rows.merged_cells])
+    self.columns = None     # the columns read of the data rows, None for all
+    self.merged_range = rows.merged_range
+    self.merged_span = rows.merged_span
+    
+  def row_values(self, rowx):
+    row = self.titles[rowx]
+    return row + [''] * (self.ncols - len(row))
+    
+  def row_len(self, rowx):
+    return len(self.titles[rowx])
+    
+  def iterrows(self):
+    rows, rowsiter = self.rows, self.rowsiter
+    self.rows = self.rowsiter = None
+    if rows is None:
+      rows = self.data.iter_sheet_rows(self.sheetx, merged_cells = False)     # they are looked up in the first rows
+      rowsiter = itertools.islice(rows, HEADINGROWS, None)
+    try:
+      rows.columns = self.columns
+      yield from rowsiter
+    finally:
+      rows.close()
+        
+  def close(self):
+    if self.rows:
+      self.rows.close()
+      self.rows = self.rowsiter = None
+    if self.data:
+      self.data.release_resources()
+      self.data = None
+      
+class CachedSheet(xlrd.sheet.MergedCellLookup):
+  '''a sheet loaded from a BookCache, the rows are padded to ncols'''
+  def __init__(self, name, ncols, mergedcells, rows):
+    self.name = name
+    self.nrows = len(rows)
+    self.ncols = ncols
+    self.rows = [row + [''] * (ncols - len(row)) for row in rows]
+    self.merged_cells = []
+    self._merged_cell_map = {}
+    self._merged_big_ranges = []
+    for crange in mergedcells:
+      self.put_merged_range(tuple(crange))
+      
+  def row_values(self, rowx):
+    return self.rows[rowx][:]
+    
+  def row_len(self, rowx):
+    return len(self.rows[rowx])
+    
+  def cell_value(self, rowx, colx):
+    return self.rows[rowx][colx]
+    
+class RowWindow:
+  '''the data rows of a item sheet read in order, the rows before the current item are released'''
+  def __init__(self, sheet):
+    self.ncols = sheet.ncols
+    if isinstance(sheet, StreamSheet):
+      self.source = sheet.iterrows()
+    else:
+      self.source = (sheet.row_values(rowx) for rowx in range(HEADINGROWS, sheet.nrows))
+    self.rows = collections.deque()
+    self.first = HEADINGROWS    # the row index of rows[0]
+    self.end = None             # the row count, once all rows are read
+    
+  def hasrow(self, rowx):
+    while self.end is None and rowx >= self.first + len(self.rows):
+      row = next(self.source, None)
+      if row is None:
+        self.end = self.first + len(self.rows)
+      else:
+        if len(row) < self.ncols:
+          row = row + [''] * (self.ncols - len(row))
+        self.rows.append(row)
+    return rowx < self.first + len(self.rows)
+    
+  def row(self, rowx):
+    if rowx < self.first or not self.hasrow(rowx):
+      raise IndexError('row %d is not in the sheet' % (rowx + 1))
+    return self.rows[rowx - self.first]
+    
+  def cell(self, rowx, colx):
+    return self.row(rowx)[colx]
+    
+  def release(self, rowx):
+    while self.first < rowx and self.rows:
+      self.rows.popleft()
+      self.first += 1
+      
+  def close(self):
+    self.source.close()
+    
 class Exporter:
   configsheettitles = ('name', 'value', 'type', 'sign', 'description')
   spacemaxrowcount = 3
@@ -280,6 +891,7 @@ class Exporter:
     self.context = context
     self.records = []
     self.constraints = []
+    self.expresses = {}
   
   def gettype(self, type_):
     if type_[-2] == '[' and  type_[-1] == ']':
@@ -304,170 +916,257 @@ class Exporter:
         
     raise ValueError('%s is not a legal type' % type_)
     
-  def buildlistexpress(self, parent, type_, name, value, isschema):
+  def buildlistschema(self, parent, type_, name, description):
     basetype = type_[:-2]        
     list_ = []
-    if isschema:
-      self.buildexpress(list_, basetype, name, None, isschema)
-      list_ = getscemainfo(list_[0], value)
+    self.buildexpress(list_, basetype, name, None, True)
+    list_ = getscemainfo(list_[0], description)
+    fillvalue(parent, name + 's', list_, True)     
+      
+  def buildobjschema(self, parent, type_, name, description):
+    obj = collections.OrderedDict()
+    fieldnamestypes = type_.strip('{}').split(':')
+    for i in range(0, len(fieldnamestypes)):
+      fieldtype, fieldname = splitspace(fieldnamestypes[i])
+      self.buildexpress(obj, fieldtype, fieldname, None, True)
+    obj = getscemainfo(obj, description)
+    fillvalue(parent, name, obj, True)       
+      
+  def buildbaseschema(self, parent, type_, name, description):
+    typename = self.gettype(type_) 
+    fillvalue(parent, name, getscemainfo(typename, description), True)   
+        
+  def buildexpress(self, parent, type_, name, value, isschema = False):
+    if not isschema:
+      self.getexpress(type_)(parent, name, value)
+      return
+      
+    typename = self.gettype(type_)
+    if typename == 'list':
+      self.buildlistschema(parent, type_, name, value)
+    elif typename == 'obj':
+      self.buildobjschema(parent, type_, name, value)
     else:
+      self.buildbaseschema(parent, type_, name, value)
+      
+  def getexpress(self, type_):
+    build = self.expresses.get(type_)
+    if build is None:
+      build = self.compileexpress(type_)
+      self.expresses[type_] = build
+    return build
+      
+  def compileexpress(self, type_):
+    typename = self.gettype(type_)
+    if typename == 'list':
+      return self.compilelistexpress(type_)
+    elif typename == 'obj':
+      return self.compileobjexpress(type_)
+    else:
+      return self.compilebasexpress(type_, typename)
+      
+  def compilelistexpress(self, type_):
+    basetype = type_[:-2]
+    buildelement = self.getexpress(basetype)
+    isstring = basetype == 'string'
+    
+    def build(parent, name, value):
+      list_ = []
       value = value.strip('[]')
-      if basetype == 'string' and '\,' in value:
+      if isstring and '\,' in value:
         valuelist = value.replace('\,', '\0').split(',')
         valuelist = [s.replace('\0', ',') for s in valuelist]
       else:
         valuelist = value.split(',')
       for v in valuelist:
-        self.buildexpress(list_, basetype, name, v)
-       
-    fillvalue(parent, name + 's', list_, isschema)     
+        buildelement(list_, name, v)
+      fillvalue(parent, name + 's', list_, False)
+    return build
+    
+  def compileobjfields(self, type_):
+    fields = []
+    for fieldnametype in type_.strip('{}').split(':'):
+      fieldtype, fieldname = splitspace(fieldnametype)
+      fields.append((fieldname, self.getexpress(fieldtype)))
+    return fields
+    
+  def compileobjexpress(self, type_):
+    fields = self.compileobjfields(type_)
       
-  def buildobjexpress(self, parent, type_, name, value, isschema):
-    obj = collections.OrderedDict()
-    fieldnamestypes = type_.strip('{}').split(':')
+    def build(parent, name, value):
+      obj = collections.OrderedDict()
+      fieldValues = value.strip('{}').split(':')
+      for (fieldname, buildfield), fieldvalue in zip(fields, fieldValues):
+        buildfield(obj, fieldname, fieldvalue)
+      fillvalue(parent, name, obj, False)
+    return build
+    
+  def compilemergedexpress(self, type_, typename):
+    '''build a merged list or obj column, the value is the field values of the sub-rows, a dict for obj or a list of dict for list'''
+    fields = self.compileobjfields(type_[:-2] if typename == 'list' else type_)
     
-    if isschema:
-      for i in range(0, len(fieldnamestypes)):
-        fieldtype, fieldname = splitspace(fieldnamestypes[i])
-        self.buildexpress(obj, fieldtype, fieldname, None, isschema)
-      obj = getscemainfo(obj, value)
+    def buildobj(values):
+      obj = collections.OrderedDict()
+      for fieldname, buildfield in fields:
+        buildfield(obj, fieldname, values.get(fieldname, ''))
+      return obj
+    
+    if typename == 'list':
+      def build(parent, name, value):
+        fillvalue(parent, name + 's', [buildobj(values) for values in value], False)
     else:
-      fieldValues = value.strip('{}').split(':')
-      for i in range(0, len(fieldnamestypes)):
-        if i < len(fieldValues):
-          fieldtype, fieldname = splitspace(fieldnamestypes[i])
-          self.buildexpress(obj, fieldtype, fieldname, fieldValues[i])
-
-    fillvalue(parent, name, obj, isschema)       
+      converters = [(fieldname, basetypeconverters.get(splitspace(fieldnametype)[0]))
+        for (fieldname, _), fieldnametype in zip(fields, type_.strip('{}').split(':'))]
       
-  def buildbasexpress(self, parent, type_, name, value, isschema):
-    typename = self.gettype(type_) 
-    if isschema:
-      value = getscemainfo(typename, value)
-    else:
-      if v.isspace() and typename != 'string':
+      def build(parent, name, value):
+        if any(value.get(fieldname) for fieldname, _ in fields):
+          fillvalue(parent, name, buildobj(value), False)
+        else:
+          # a obj without any field value is not exported, as its old "a:b" string was empty,
+          # but a empty int, double or bool field it has is still a error as before
+          for fieldname, convert in converters:
+            if convert and fieldname in value:
+              convert(value[fieldname])
+    return build
+    
+  def compilebasexpress(self, type_, typename):
+    bindtype = typename if isinstance(typename, BindType) else None
+    basetype = bindtype.typename if bindtype else typename
+    convert = basetypeconverters.get(basetype)
+    skipspace = basetype not in ('string', 'map')     # map value may be a built dict
+    
+    def build(parent, name, value):
+      if skipspace and value.isspace():
         return
-        
-      if typename == 'int':
-        value = int(float(value))
-      elif typename == 'double':
-        value = float(value)   
-      elif typename == 'string':
-        if value.endswith('.0'):          # may read is like "123.0"
-          try:
-            value = str(int(float(value)))
-          except ValueError:
-            value = str(value)
-        else:            
-          value = str(value)
-      elif typename == 'bool':
-        try:
-          value = int(float(value))
-          value = False if value == 0 else True 
-        except ValueError:
-          value = value.lower() 
-          if value in ('false', 'no', 'off'):
-            value = False
-          elif value in ('true', 'yes', 'on'):
-            value = True
-          else:    
-            raise ValueError('%s is a illegal bool value' % value) 
-    fillvalue(parent, name, value, isschema)   
-    
-    if not isschema and isinstance(typename, BindType):
-      self.addconstraint(typename.mark, typename.field, (type_, name, value), typename.field1)
-        
-  def buildexpress(self, parent, type_, name, value, isschema = False):
-    typename = self.gettype(type_)
-    if typename == 'list':
-      self.buildlistexpress(parent, type_, name, value, isschema)
-    elif typename == 'obj':
-      self.buildobjexpress(parent, type_, name, value, isschema)
-    else:
-      self.buildbasexpress(parent, type_, name, value, isschema)
+      if convert:
+        value = convert(value)
+      fillvalue(parent, name, value, False)
+      if bindtype:
+        self.addconstraint(bindtype.mark, bindtype.field, (type_, name, value), bindtype.field1)
+    return build
       
   def getrootname(self, exportmark, isitem):
     return exportmark + 's' + (self.context.extension or '') if isitem else exportmark + (self.context.extension or '')
 
   def export(self):
-    paths = re.split(r'[,;|]+', context.path.strip())
-
-    for self.path in paths:
-      if not self.path:
-        continue
+    exporttargets([self])
+    
+  def prepare(self):
+    self.paths = splitpaths(self.context.path)
+    self.checkpaths()
+    
+    self.manifest = None
+    self.unchanged = set()
+    if self.context.incremental and not self.context.headings:
+      self.manifest = Manifest(self.context)
+      self.unchanged = self.manifest.getunchanged(self.paths)
       
-      self.checkpath(self.path)
-      data = xlrd.open_workbook(self.path)
-      cout = None
-      for sheet in data.sheets():
-        exportmark = getexportmark(sheet.name)
-        self.sheetname = sheet.name
-        if exportmark:
-          coutmark = sheet.name.endswith('<<')
-          coutendmark = sheet.name.endswith('>>')
-          
-          mapmark = getIsMap(sheet.name)
-          maplevel = 1
-          if mapmark:
-            maplevel = getMapLevel(sheet.name)
-
-          configtitleinfo = self.getconfigsheetfinfo(sheet)
-          if not configtitleinfo:
-            root = self.getrootname(exportmark, not coutmark)
-            item = exportmark
-          else:
-            root = self.getrootname(exportmark, False)
-            item = None
-          
-          if not cout:
-            exportfile = gerexportfilename(root, self.context.format, self.context.folder)
-            self.checksheetname(self.path, sheet.name, root)
+  def skipbook(self, path):
+    if path not in self.unchanged:
+      return False
+    self.addunchangedrecords(path, self.manifest.getrecords(path))
+    print('%s is not change, so skip!' % path)
+    return True
+    
+  def getsettings(self):
+    return dict((k, v) for k, v in vars(self.context).items() if k != 'targets')
+    
+  def mergebook(self, records, constraints):
+    for r in records:
+      self.checksheetname(r.path, r.sheetname, r.root)
+      self.records.append(r)
+    self.constraints.extend(constraints)
+    
+  def finish(self):
+    if not self.context.headings:      # the item sheets have no data rows
+      self.checkconstraint()
+    self.saves()                
+    if self.manifest:
+      self.manifest.save(self.paths, self.unchanged, self.records, self.constraints)
+    
+  def exportbook(self, path, sheets):
+    self.path = path
+    cout = None
+    for sheet in sheets:
+      exportmark = getexportmark(sheet.name)
+      self.sheetname = sheet.name
+      if exportmark:
+        coutmark = sheet.name.endswith('<<')
+        coutendmark = sheet.name.endswith('>>')
         
-            exportobj = None
-            nochanged = False
-            if isoutofdate(self.path, exportfile):
-              if item:
-                exportobj = self.exportitemsheet(sheet, mapmark, maplevel)
-              else:
-                exportobj = self.exportconfigsheet(sheet, configtitleinfo)
-            else:
-              nochanged = True
-              print(exportfile + ' is not change, so skip!')
+        mapmark = getIsMap(sheet.name)
+        maplevel = 1
+        if mapmark:
+          maplevel = getMapLevel(sheet.name)
 
-            if coutmark:
-              if not item:
-                cout = exportobj
-              else:
-                cout = (collections.OrderedDict(), collections.OrderedDict())
-                cout[0][item + 's'] = [[exportobj[0]]]
-                item = None
-                exportobj = cout
-                obj = exportobj[1]
-                if obj:
-                  cout[1][item + 's'] = obj
-                  
-            self.addrecord(self.path, sheet, exportfile, root, item, exportobj, exportmark)
-            if coutmark and nochanged:
-              break
+        configtitleinfo = self.getconfigsheetfinfo(sheet)
+        if not configtitleinfo:
+          root = self.getrootname(exportmark, not coutmark)
+          item = exportmark
+        else:
+          root = self.getrootname(exportmark, False)
+          item = None
+        
+        if not cout:
+          exportfile = gerexportfilename(root, self.context.format, self.context.folder)
+          self.checksheetname(self.path, sheet.name, root)
+      
+          if item:
+            exportobj = self.exportitemsheet(sheet, mapmark, maplevel)
           else:
-            if item:
-              exportobj = self.exportitemsheet(sheet, mapmark, maplevel)
+            exportobj = self.exportconfigsheet(sheet, configtitleinfo)
+
+          if coutmark:
+            if not item:
+              cout = exportobj
+            else:
+              cout = (collections.OrderedDict(), collections.OrderedDict())
               cout[0][item + 's'] = [[exportobj[0]]]
+              item = None
+              exportobj = cout
               obj = exportobj[1]
               if obj:
                 cout[1][item + 's'] = obj
-            else:
-              exportobj = self.exportconfigsheet(sheet, configtitleinfo)
-              cout[0].update(exportobj[0])   
-              obj = exportobj[1]
-              if obj:
-                cout[1].update(obj)
-          
-          if coutendmark:
-                cout = None;
                 
-    self.checkconstraint()
-    self.saves()                
+          self.addrecord(self.path, sheet, exportfile, root, item, exportobj, exportmark)
+        else:
+          if item:
+            exportobj = self.exportitemsheet(sheet, mapmark, maplevel)
+            cout[0][item + 's'] = [[exportobj[0]]]
+            obj = exportobj[1]
+            if obj:
+              cout[1][item + 's'] = obj
+          else:
+            exportobj = self.exportconfigsheet(sheet, configtitleinfo)
+            cout[0].update(exportobj[0])   
+            obj = exportobj[1]
+            if obj:
+              cout[1].update(obj)
+        
+        if coutendmark:
+              cout = None;
+              
+  def addunchangedrecords(self, path, infos):
+    for info in infos:
+      self.checksheetname(path, None, info['root'])
+      r = Record(path, None, info['exportfile'], info['root'], info['item'], None, info['exportmark'])
+      r.schema = info['schema']
+      r.hash = info['hash']
+      r.unchanged = True
+      self.records.append(r)
+      
+  def reloadbook(self, path):
+    exporter = Exporter(self.context)
+    data = openbook(path, signs = [self.context.sign], cache = getcache(self.context))
+    try:
+      exporter.exportbook(path, data)
+    finally:
+      closesheets(data)
+    for loaded in exporter.records:
+      r = next(r for r in self.records if r.path == path and r.root == loaded.root)
+      r.sheet = loaded.sheet
+      r.sheetname = loaded.sheetname
+      r.obj = loaded.obj
     
   def getconfigsheetfinfo(self, sheet):
     titles = sheet.row_values(0)
@@ -483,6 +1182,18 @@ class Exporter:
     else:
       return None
         
+  def compilecolumn(self, colindex, type_, name, signmatch, width):
+    column = Column(colindex, type_, name, signmatch, width)
+    if signmatch and type_:
+      column.typename = self.gettype(type_)
+      if width > 1 and column.typename == 'list':
+        column.firstfield = get_obj_type_first_field(type_).strip()
+      if width > 1 and column.typename in ('list', 'obj'):
+        column.build = self.compilemergedexpress(type_, column.typename)
+      else:
+        column.build = self.getexpress(type_)
+    return column
+        
   def exportitemsheet(self, sheet, isMap = False, mapLevel = 1 ):
     descriptions = sheet.row_values(0)
     types = sheet.row_values(1)
@@ -490,9 +1201,11 @@ class Exporter:
     signs = sheet.row_values(3)
     
     titleinfos = []
+    columns = []            # the column plan, one entry per merged title cell
     schemaobj = collections.OrderedDict()
     
     try:
+      nextcol = 0
       for colindex in range(sheet.ncols):
         type_ = str(types[colindex]).strip()
         name = str(names[colindex]).strip()
@@ -502,6 +1215,11 @@ class Exporter:
         if self.context.codegenerator:
           if type_ and name and signmatch:
             self.buildexpress(schemaobj, type_, name, descriptions[colindex], True)
+            
+        if colindex >= nextcol:
+          width = cell_size(3, colindex, sheet)[1]
+          nextcol = nextcol + width
+          columns.append(self.compilecolumn(colindex, type_, name, signmatch, width))
                     
     except Exception as e: 
       e.args += ('%s has a title error, %s at %d column in %s' % (sheet.name, (type_, name), colindex + 1, self.path) , '')
@@ -510,117 +1228,113 @@ class Exporter:
     obj = collections.OrderedDict()
     list_ = []
     hasexport = next((i for i in titleinfos if i[0] and i[1] and i[2]), False)
+    if self.context.headings:
+      # the data rows are not exported, a sheet without them has no obj as it is not saved in a export
+      if not hasdatarows(sheet):
+        return (schemaobj, None)
+      hasexport = False
     if hasexport:
+      rows = RowWindow(sheet)
       try:
         spacerowcount = 0
         nextrow = 4
-        for self.rowindex in range(4, sheet.nrows):
-          if self.rowindex >= nextrow:
-            row = sheet.row_values(self.rowindex)
-            sizeInfo = cell_size(self.rowindex, 0, sheet)
-            height = sizeInfo[0]
-            nextrow = nextrow+height
-            item = collections.OrderedDict()
+        while rows.hasrow(nextrow):
+          self.rowindex = nextrow
+          rows.release(self.rowindex)
+          row = rows.row(self.rowindex)
+          sizeInfo = cell_size(self.rowindex, 0, sheet)
+          height = sizeInfo[0]
+          nextrow = nextrow+height
+          item = collections.OrderedDict()
             
-            firsttext = str(row[0]).strip()
-            if not firsttext:
-              spacerowcount += 1
-              if spacerowcount >= self.spacemaxrowcount:      # if space row is than max count, skil follow rows     
-                break
+          firsttext = str(row[0]).strip()
+          if not firsttext:
+            spacerowcount += 1
+            if spacerowcount >= self.spacemaxrowcount:      # if space row is than max count, skil follow rows     
+              break
             
-            if not firsttext or firsttext[0] == '#':    # current line skip
-              continue
+          if not firsttext or firsttext[0] == '#':    # current line skip
+            continue
               
-            skiptokenindex = None   
-            if firsttext[0] == '!':
-              nextpos = firsttext.find('!', 1)
-              if nextpos >= 2:
-                signtoken = firsttext[1: nextpos]
-                if issignmatch(self.context.sign, signtoken.strip()):
-                  continue
-                else:
-                  skiptokenindex = len(signtoken) + 2
+          skiptokenindex = None   
+          if firsttext[0] == '!':
+            nextpos = firsttext.find('!', 1)
+            if nextpos >= 2:
+              signtoken = firsttext[1: nextpos]
+              if issignmatch(self.context.sign, signtoken.strip()):
+                continue
+              else:
+                skiptokenindex = len(signtoken) + 2
             
-            itemkey = []
-
-            nextcol = 0
-            for self.colindex in range(sheet.ncols):
-              if self.colindex >= nextcol: 
-                curSizeInfo = cell_size(3, self.colindex, sheet)
-                width = curSizeInfo[1]
-                nextcol = nextcol + width
-                value = ""
-                signmatch = titleinfos[self.colindex][2]
-                if signmatch:
-                  type_ = titleinfos[self.colindex][0]
-                  name = titleinfos[self.colindex][1]
-                  typename = self.gettype(type_)
-                  if width > 1 and typename == "list":
-                    objData = collections.OrderedDict()
-                    firstfieldkey = get_obj_type_first_field(type_).strip()
-                    for curRow in range(self.rowindex, self.rowindex+height):
-                      objkey = str(sheet.cell_value(curRow, self.colindex)).strip()
-                      if objkey == firstfieldkey:
-                        if firstfieldkey in objData.keys():
-                            value = value + get_obj_str_value(objData, type_) + ","
-                        objData = collections.OrderedDict()
-                        
-                      objvalue = str(sheet.cell_value(curRow, self.colindex+1)).strip()
-                      objData[objkey] = objvalue
-                    if firstfieldkey in objData.keys():
-                      value = value + get_obj_str_value(objData, type_)
-
-                  elif width > 1 and typename == "obj":
-                    objData = collections.OrderedDict()
-                    for curRow in range(self.rowindex, self.rowindex+height):
-                      objkey = str(sheet.cell_value(curRow, self.colindex)).strip()
-                      objvalue = str(sheet.cell_value(curRow, self.colindex+1)).strip()
-                      objData[objkey] = objvalue
-                    
-                    value = get_obj_str_value(objData, type_)
-                  elif width > 1 and typename == "map":
+          itemkey = []
+
+          for column in columns:
+            self.colindex = column.index
+            if column.signmatch:
+              width = column.width
+              type_ = column.type_
+              name = column.name
+              typename = column.typename
+              if width > 1 and typename == "list":
+                value = []          # a obj starts at each sub-row of the first field
+                objData = None
+                firstfieldkey = column.firstfield
+                for curRow in range(self.rowindex, self.rowindex+height):
+                  objkey = str(rows.cell(curRow, self.colindex)).strip()
+                  if objkey == firstfieldkey:
                     objData = collections.OrderedDict()
-   
-                  
-                    for curRow in range(self.rowindex, self.rowindex+height):
-                      objkey = str(sheet.cell_value(curRow, self.colindex)).strip()
-                      objType = str(sheet.cell_value(curRow, self.colindex+1)).strip()
-                      objvalue = str(sheet.cell_value(curRow, self.colindex+2)).strip()
-                      if not (objkey == '' or objType == '' or objvalue == ''):
-                        self.buildexpress(objData, objType, objkey, objvalue)
-                    type_ = 'map'
-                    value = objData
-                  else:
-                    value = str(row[self.colindex])
-
-                  if skiptokenindex and self.colindex == 0:
-                    value = value.lstrip()[skiptokenindex:]
-                    
-                  if type_ and name and value:
-                    self.buildexpress(item, type_, name, value)
+                    value.append(objData)
+                  if objData is not None:
+                    objData[objkey] = str(rows.cell(curRow, self.colindex+1)).strip()
 
-                  if len(itemkey) < mapLevel:
-                    itemkey.append(item[name])
+              elif width > 1 and typename == "obj":
+                value = collections.OrderedDict()
+                for curRow in range(self.rowindex, self.rowindex+height):
+                  objkey = str(rows.cell(curRow, self.colindex)).strip()
+                  objvalue = str(rows.cell(curRow, self.colindex+1)).strip()
+                  value[objkey] = objvalue
+              elif width > 1 and typename == "map":
+                objData = collections.OrderedDict()
+                for curRow in range(self.rowindex, self.rowindex+height):
+                  objkey = str(rows.cell(curRow, self.colindex)).strip()
+                  objType = str(rows.cell(curRow, self.colindex+1)).strip()
+                  objvalue = str(rows.cell(curRow, self.colindex+2)).strip()
+                  if not (objkey == '' or objType == '' or objvalue == ''):
+                    self.buildexpress(objData, objType, objkey, objvalue)
+                value = objData
+              else:
+                value = str(row[self.colindex])
 
-                spacerowcount = 0
-                
-            if isMap:
-                if item:
-                  setObj = obj
-                  keyLen = len(itemkey)
-                  for idx in range(0, keyLen-1):
-                    key = itemkey[idx]
-                    if not (key in setObj):
-                      setObj[key] = collections.OrderedDict();
-                    setObj = setObj[key]
+              if skiptokenindex and self.colindex == 0 and isinstance(value, str):
+                value = value.lstrip()[skiptokenindex:]
                   
-                  setObj[itemkey[keyLen-1]] = item
-            else:
+              if type_ and name and value:
+                column.build(item, name, value)
+
+              if len(itemkey) < mapLevel:
+                itemkey.append(item[name])
+
+            spacerowcount = 0
+              
+          if isMap:
               if item:
-                list_.append(item)
+                setObj = obj
+                keyLen = len(itemkey)
+                for idx in range(0, keyLen-1):
+                  key = itemkey[idx]
+                  if not (key in setObj):
+                    setObj[key] = collections.OrderedDict();
+                  setObj = setObj[key]
+                  
+                setObj[itemkey[keyLen-1]] = item
+          else:
+            if item:
+              list_.append(item)
       except Exception as e:        
           e.args += ('%s has a error in %d row %d column in %s' % (sheet.name, self.rowindex + 1, self.colindex + 1, self.path) , '')
           raise e
+      finally:
+        rows.close()
     
     if isMap:
       return (schemaobj, obj)
@@ -677,11 +1391,19 @@ class Exporter:
   def saves(self):
     schemas = []
     for r in self.records:
-        if r.obj:
+        if r.unchanged:
+          if not r.hash:        # was not saved
+            continue
+        elif self.context.headings:
+          if not r.schema or r.obj is None:      # no column is exported, or the sheet has no data rows
+            continue
+        elif r.obj:
           self.save(r)
+        else:
+          continue
           
-          if self.context.codegenerator:        # has code generator
-            schemas.append({ 'exportfile' : r.exportfile, 'root' : r.root, 'item' : r.item or r.exportmark, 'schema' : r.schema })
+        if self.context.codegenerator:        # has code generator
+          schemas.append({ 'exportfile' : r.exportfile, 'root' : r.root, 'item' : r.item or r.exportmark, 'schema' : r.schema })
     
     if schemas and self.context.codegenerator:
       schemasjson = json.dumps(schemas, ensure_ascii = False, indent = 2)
@@ -699,10 +1421,9 @@ class Exporter:
       os.makedirs(self.context.folder)
         
     if self.context.format == 'json':
-      jsonstr = json.dumps(record.obj, ensure_ascii = False, indent = 2)
       with codecs.open(record.exportfile, 'w', 'utf-8') as f:
-        f.write(jsonstr)
-      print('save %s from %s in %s' % (record.exportfile, record.sheet.name, record.path))
+        writeparts(f, tojson(record.obj, None if self.context.compact else 2))
+      print('save %s from %s in %s' % (record.exportfile, record.sheetname, record.path))
         
     elif self.context.format == 'xml':
       if record.item:
@@ -710,11 +1431,10 @@ class Exporter:
       savexml(record) 
         
     elif self.context.format == 'lua':
-      luastr = "".join(tolua(record.obj))
       with codecs.open(record.exportfile, 'w', 'utf-8') as f:
         f.write('return ')
-        f.write(luastr)
-      print('save %s from %s in %s' % (record.exportfile, record.sheet.name, record.path))
+        writelua(f, record.obj)
+      print('save %s from %s in %s' % (record.exportfile, record.sheetname, record.path))
       
     elif self.context.format == 'ycl':
       g = toycl(record.obj)
@@ -722,7 +1442,7 @@ class Exporter:
       yclstr = "".join(g)
       with codecs.open(record.exportfile, 'w', 'utf-8') as f:
         f.write(yclstr)
-      print('save %s from %s in %s' % (record.exportfile, record.sheet.name, record.path))
+      print('save %s from %s in %s' % (record.exportfile, record.sheetname, record.path))
 
   def addrecord(self, path, sheet, exportfile, root, item, obj, exportmark):
     r = Record(path, sheet, exportfile, root, item, obj, exportmark)
@@ -733,10 +1453,10 @@ class Exporter:
     if r:
       raise ValueError('%s in %s is already defined in %s' % (root, path, r.path))
       
-  def checkpath(self, path):
-    r = next((r for r in self.records if r.path == path), False)
-    if r:
-      raise ValueError('%s is already export' % path)
+  def checkpaths(self):
+    for i, path in enumerate(self.paths):
+      if path in self.paths[:i]:
+        raise ValueError('%s is already export' % path)
             
   def addconstraint(self, mark, field, valueinfo, field1):
     c = Constraint(mark, field)
@@ -748,38 +1468,47 @@ class Exporter:
     c.colindex = self.colindex
     self.constraints.append(c)
 
+  def buildconstraintindex(self, c):
+    r = None
+    for record in self.records:
+      if record.item == c.mark or record.exportmark == c.mark :
+        if record.unchanged and record.obj is None:     # skipped by the manifest, load it now
+          self.reloadbook(record.path)
+        if c.field1 != None:
+          r = collections.OrderedDict()
+          r.obj = record.obj[c.field1+"s"]
+        else:
+          r = record;
+        break;
+    if None == r:
+      raise ValueError('%s(mark) not found ,%s has a constraint %s error in %d row %d column in %s' % (c.mark, c.sheetname, c.valueinfo, c.rowindex + 1, c.colindex + 1, c.path))
+    
+    if r.obj is None and r.sheet:  # is not change so not load, a empty export is final
+      exportobj = self.exportitemsheet(r.sheet)
+      r.setobj(exportobj)
+      
+    values = set()
+    for ti in r.obj:
+      if isinstance(ti, str) or isinstance(ti, int) or isinstance(ti, float):
+        ti = r.obj[ti]
+      if c.field in ti:
+        try:
+          values.add(ti[c.field])
+        except TypeError:     # list or obj field, can not be referenced
+          pass
+    return values
+
   def checkconstraint(self):
+    indexes = {}      # (mark, field1, field) : set of the referenced field values
     for c in self.constraints:
-      r = None
-      for record in self.records:
-        if record.item == c.mark or record.exportmark == c.mark :
-          if c.field1 != None:
-            r = collections.OrderedDict()
-            r.obj = record.obj[c.field1+"s"]
-          else:
-            r = record;
-          break;
-      if None == r:
-        raise ValueError('%s(mark) not found ,%s has a constraint %s error in %d row %d column in %s' % (c.mark, c.sheetname, c.valueinfo, c.rowindex + 1, c.colindex + 1, c.path))
-      
-      if not r.obj:  # is not change so not load
-        exportobj = self.exportitemsheet(r.sheet)
-        r.setobj(exportobj)
+      key = (c.mark, c.field1, c.field)
+      values = indexes.get(key)
+      if values is None:
+        values = self.buildconstraintindex(c)
+        indexes[key] = values
       
       v = c.valueinfo[2]    
-      find = False
-
-      for ti in r.obj:
-        if isinstance(ti, str) or isinstance(ti, int) or isinstance(ti, float):
-          if(r.obj[ti][c.field] == v):
-            find = True;
-            break;
-        elif isinstance(ti, object):
-          if(ti[c.field] == v):
-            find = True;
-            break;
-      # i = next((i for i in r.obj if r.obj[i][c.field] == v), False)    
-      if not find:
+      if v not in values:
         raise ValueError('%s(field) %s not found ,%s has a constraint %s error in %d row %d column in %s' % (c.field, v, c.sheetname, c.valueinfo, c.rowindex + 1, c.colindex + 1, c.path))
     
 if __name__ == '__main__':
@@ -795,12 +1524,55 @@ if __name__ == '__main__':
     -t      : suffix, export file suffix
     -c      : a file path, save the excel structure to json
               the external program uses this file to automatically generate the read code
+    -m      : compact json, no indent and spaces
+    -i      : incremental export, keep a manifest in the out folder and skip the excel files
+              that are not changed since the last export
+    -g      : headings only, read the title rows of the item sheets and save the -c file
+              without the export files, the data rows are not parsed, a item sheet without
+              data rows is left out of it as in a export
+    -j      : jobs, the number of processes that parse the excel files, defalut 1
+    -k      : a cache folder, keeps the sheets read from the excel files, a file that is not changed
+              is loaded from it instead of being parsed again, the least recently used are removed
+    -o      : an export target, the value is the -p -f -e -s -t -c -m -g options of the target,
+              unset options are taken from the command line. can be used more than once,
+              the excel files are parsed only once for all targets
+              e.g. -o "-f config_server -e lua -s server" -o "-f config_client -e json -s client"
     -h      : print this help message and exit
     
     https://github.com/yanghuan/proton'''
+    
+  def parseoptions(context, argv, shortopts):
+    opst, args = getopt.getopt(argv, shortopts)
+    for op,v in opst:
+      if op == '-p':
+        context.path = v
+      elif op == '-f':
+        context.folder = v
+      elif op == '-e':
+        context.format = v.lower() 
+      elif op == '-s':
+        context.sign = v 
+      elif op == '-t':
+        context.extension = v
+      elif op == '-c':
+        context.codegenerator = v    
+      elif op == '-m':
+        context.compact = True
+      elif op == '-g':
+        context.headings = True
+      elif op == '-i':
+        context.incremental = True
+      elif op == '-j':
+        context.jobs = int(v)
+      elif op == '-k':
+        context.cache = v
+      elif op == '-o':
+        context.targets.append(v)
+      elif op == '-h':
+        print(Context.__doc__)
+        sys.exit()
   
   print('argv:' , sys.argv)
-  opst, args = getopt.getopt(sys.argv[1:], 'p:f:e:s:t:c:h')
 
   context = Context()
   context.path = None
@@ -809,25 +1581,23 @@ if __name__ == '__main__':
   context.sign = None
   context.extension = None
   context.codegenerator = None
-
-  for op,v in opst:
-    if op == '-p':
-      context.path = v
-    elif op == '-f':
-      context.folder = v
-    elif op == '-e':
-      context.format = v.lower() 
-    elif op == '-s':
-      context.sign = v 
-    elif op == '-t':
-      context.extension = v
-    elif op == '-c':
-      context.codegenerator = v    
-    elif op == '-h':
-      print(Context.__doc__)
-      sys.exit()
+  context.compact = False
+  context.incremental = False
+  context.headings = False
+  context.jobs = 1
+  context.cache = None
+  context.targets = []
+  
+  parseoptions(context, sys.argv[1:], 'p:f:e:s:t:c:o:j:k:migh')
+  
+  targets = []
+  for v in context.targets:
+    target = copy.copy(context)
+    parseoptions(target, splitargs(v), 'p:f:e:s:t:c:mg')
+    targets.append(target)
+  context.targets = targets or [context]
       
-  if not context.path:
+  if not all(target.path and (target.codegenerator or not target.headings) for target in context.targets):
     print(Context.__doc__)
     sys.exit(2)
     
@@ -38,7 +38,18 @@ def open_workbook(filename=None,
                   encoding_override=None,
                   formatting_info=False,
                   on_demand=False,
-                  ragged_rows=False):
+                  ragged_rows=False,
+                  sheet_filter=None,
+                  lazy_sst=False,
+                  use_expat=False,
+                  max_rows=None,
+                  stop_row=None,
+                  column_filter=None,
+                  compact_cells=False,
+                  sheet_jobs=None,
+                  minimal_metadata=False,
+                  preallocate_cells=False,
+                  detach_rows=False):
     """
     Open a spreadsheet file for data extraction.
 
@@ -100,6 +111,112 @@ def open_workbook(filename=None,
       This can result in substantial memory savings if rows are of widely
       varying sizes. See also the :meth:`~xlrd.sheet.Sheet.row_len` method.
 
+    :param sheet_filter:
+
+      A callable which is passed each sheet name and returns true if that
+      sheet should be loaded when the workbook is opened. Sheets that are
+      rejected are never decompressed or parsed; they are reported as not
+      loaded by :meth:`~xlrd.book.Book.sheet_loaded`. Unless ``on_demand``
+      is also ``True`` they can't be loaded later, so iterate over the
+      loaded sheets instead of calling :meth:`~xlrd.book.Book.sheets`.
+      Ignored when ``on_demand`` is ``True``.
+
+    :param lazy_sst:
+
+      ``True`` means that the shared strings of an xlsx file are only located
+      when the workbook is opened, and each one is decoded the first time a
+      cell refers to it. Decoded strings are kept in a bounded cache. This
+      saves time and memory when only some sheets of a workbook with a large
+      shared string table are loaded. Ignored for xls files.
+
+    :param use_expat:
+
+      ``True`` means that the worksheets of an xlsx file are parsed with
+      :mod:`xml.parsers.expat` handlers that store each cell as it is read,
+      instead of building ElementTree elements for every row. The cell values
+      are the same; this is faster for large sheets. Ignored for xls files.
+
+    :param max_rows:
+
+      When not ``None``, only the first ``max_rows`` rows of each worksheet of
+      an xlsx file are read; parsing of the sheet stops at the first row
+      beyond them. Merged cells are stored after the cells, so they
+      are not read either. This is useful when only the heading rows
+      are needed. Ignored for xls files.
+
+    :param stop_row:
+
+      A callable which is passed the :class:`~xlrd.sheet.Sheet` being read
+      and the index of each row of an xlsx worksheet, after the cells of the
+      row have been stored; the rows are not padded yet, and a row without
+      cells leaves ``sheet.nrows <= rowx``. When it returns true, the rest of
+      the rows are skipped without being parsed; the merged cells are still
+      read. Use this to stop at the end of the data of sheets that have
+      formatted but empty rows below it. Ignored for xls files.
+
+    :param column_filter:
+
+      A callable which is passed the :class:`~xlrd.sheet.Sheet` being read
+      and the index of a row before its cells are stored. It returns ``None``
+      to store all the cells of the row, or a collection of the column
+      indexes to store; the cells of other columns are skipped as if they
+      were empty. The rows before it are already stored, so the columns can
+      be chosen from the heading rows.
+
+    :param compact_cells:
+
+      ``True`` means that the cells of each sheet are stored by column:
+      cell types in byte arrays, numbers and dates in arrays of doubles, and
+      other values in lists with equal strings shared. Empty cells hold no
+      value, and merged ranges are indexed by column instead of cell by
+      cell. This takes several times less memory for large sheets, while
+      reading single cells is slower. The :class:`~xlrd.sheet.Sheet` methods
+      return the same values.
+
+    :param sheet_jobs:
+
+      When more than 1, the worksheets of an xlsx file are parsed in a
+      :class:`multiprocessing.Pool` of at most that many processes, after
+      the shared strings and styles are loaded. Each sheet is sent back as
+      its cell lists and put in the same :class:`~xlrd.book.Book`. This
+      saves time for workbooks with several large sheets. ``stop_row`` and
+      ``column_filter`` are called in the worker processes, so changes they
+      make to their own state are not seen by the caller, and with the
+      ``spawn`` start method they must be picklable. Ignored for xls files,
+      when ``file_contents`` is given and when ``on_demand`` is ``True``.
+
+    :param minimal_metadata:
+
+      ``True`` means that only the cells and the merged cells of an xlsx
+      file are read, with the number formats and cell XFs that tell dates
+      from numbers. The styles part is scanned for these two elements and
+      the rest of it is not parsed. The document properties and the cell
+      comments are not read, so :attr:`~xlrd.book.Book.props`,
+      :attr:`~xlrd.book.Book.user_name` and
+      :attr:`~xlrd.sheet.Sheet.cell_note_map` are empty. This cuts the time
+      to open small workbooks. Ignored for xls files.
+
+    :param preallocate_cells:
+
+      ``True`` means that the rows of a sheet are stored at once from the
+      dimension recorded in the file, before its cells are read, instead of
+      growing as each cell is put. If a cell turns up outside the dimension,
+      the rows are cut back and the sheet is read as usual. The
+      :class:`~xlrd.sheet.Sheet` has the same rows either way once it is
+      loaded; while it is read, ``stop_row`` and ``column_filter`` see rows
+      as wide as the dimension. Ignored with
+      ``ragged_rows`` or ``compact_cells``, and for dimensions of more than
+      :attr:`~xlrd.sheet.Sheet.preallocate_max_cells` cells.
+
+    :param detach_rows:
+
+      ``True`` means that each row of an xlsx worksheet is removed from the
+      ``<sheetData>`` element as soon as its cells are stored, instead of
+      being left there emptied. The memory used by the parser then stays the
+      same however many rows the sheet has. This is slower, as ElementTree
+      reports the start of every element as well; ``use_expat`` keeps no
+      elements either. Ignored for xls files and with ``use_expat``.
+
     :returns: An instance of the :class:`~xlrd.book.Book` class.
     """
 
@@ -136,6 +253,17 @@ def open_workbook(filename=None,
                 formatting_info=formatting_info,
                 on_demand=on_demand,
                 ragged_rows=ragged_rows,
+                sheet_filter=sheet_filter,
+                lazy_sst=lazy_sst,
+                use_expat=use_expat,
+                max_rows=max_rows,
+                stop_row=stop_row,
+                column_filter=column_filter,
+                compact_cells=compact_cells,
+                sheet_jobs=sheet_jobs,
+                minimal_metadata=minimal_metadata,
+                preallocate_cells=preallocate_cells,
+                detach_rows=detach_rows,
             )
             return bk
         if 'xl/workbook.bin' in component_names:
@@ -155,6 +283,10 @@ def open_workbook(filename=None,
         formatting_info=formatting_info,
         on_demand=on_demand,
         ragged_rows=ragged_rows,
+        sheet_filter=sheet_filter,
+        column_filter=column_filter,
+        compact_cells=compact_cells,
+        preallocate_cells=preallocate_cells,
     )
     return bk
 
@@ -71,13 +71,18 @@ def open_workbook_xls(filename=None,
                       logfile=sys.stdout, verbosity=0, use_mmap=USE_MMAP,
                       file_contents=None,
                       encoding_override=None,
-                      formatting_info=False, on_demand=False, ragged_rows=False):
+                      formatting_info=False, on_demand=False, ragged_rows=False,
+                      sheet_filter=None, column_filter=None, compact_cells=False,
+                      preallocate_cells=False):
     t0 = perf_counter()
     if TOGGLE_GC:
         orig_gc_enabled = gc.isenabled()
         if orig_gc_enabled:
             gc.disable()
     bk = Book()
+    bk.column_filter = column_filter
+    bk.compact_cells = compact_cells
+    bk.preallocate_cells = preallocate_cells
     try:
         bk.biff2_8_load(
             filename=filename, file_contents=file_contents,
@@ -117,7 +122,7 @@ def open_workbook_xls(filename=None,
             bk.parse_globals()
             bk._sheet_list = [None for sh in bk._sheet_names]
             if not on_demand:
-                bk.get_sheets()
+                bk.get_sheets(sheet_filter)
         bk.nsheets = len(bk._sheet_list)
         if biff_version == 45 and bk.nsheets > 1:
             fprintf(
@@ -485,6 +490,43 @@ class Book(BaseObject):
         """
         return self._sheet_names[:]
 
+    def iter_sheet_rows(self, sheet_name_or_index, merged_cells=True):
+        """
+        Reads the rows of a worksheet one at a time, without loading it.
+
+        For an xlsx file the rows are parsed from the worksheet part as they
+        are iterated, and only the rows of one chunk of the part are kept at
+        a time. The merged ranges are read before the first row. The book
+        must be opened with ``on_demand=True``, and its resources must not
+        be released while the rows are read.
+
+        For other files the sheet is loaded, and its rows are yielded from
+        the loaded sheet.
+
+        :param sheet_name_or_index: Name or index of the sheet required.
+        :param merged_cells: ``False`` skips the merged ranges of an xlsx
+          sheet, when they are known from an earlier read; the
+          :class:`~xlrd.sheet.SheetRows` then has none.
+        :returns: A :class:`~xlrd.sheet.SheetRows`; iterate it for the
+          row value lists, and call its ``close`` method if it is not
+          iterated to the end.
+        """
+        if isinstance(sheet_name_or_index, int):
+            sheetx = sheet_name_or_index
+        else:
+            try:
+                sheetx = self._sheet_names.index(sheet_name_or_index)
+            except ValueError:
+                raise XLRDError('No sheet named <%r>' % sheet_name_or_index)
+        if self._sheet_loader is None or self._sheet_list[sheetx]:
+            sh = self.sheet_by_index(sheetx)
+            rows = sheet.SheetRows(self, name=sh.name, number=sheetx)
+            for crange in sh.merged_cells:
+                rows.put_merged_range(crange)
+            rows.set_source((rowx, sh.row_values(rowx)) for rowx in xrange(sh.nrows))
+            return rows
+        return self._sheet_loader.iter_sheet_rows(sheetx, merged_cells)
+
     def sheet_loaded(self, sheet_name_or_index):
         """
         :param sheet_name_or_index: Name or index of sheet enquired upon
@@ -529,6 +571,10 @@ class Book(BaseObject):
         same object has no ill effect.
         """
         self._resources_released = 1
+        if self._sheet_loader is not None:
+            # xlsx: close the zip container kept open for on_demand loading
+            self._sheet_loader.release_resources()
+            self._sheet_loader = None
         if hasattr(self.mem, "close"):
             # must be a mmap.mmap object
             self.mem.close()
@@ -591,6 +637,10 @@ class Book(BaseObject):
         self.style_name_map = {}
         self.mem = b''
         self.filestr = b''
+        self._sheet_loader = None # set for xlsx books; loads sheets from the zip
+        self.column_filter = None # picks the columns stored for each row, see open_workbook
+        self.compact_cells = False # store the cells of each sheet by column, see open_workbook
+        self.preallocate_cells = False # store the rows of each sheet's dimension first, see open_workbook
 
     def biff2_8_load(self, filename=None, file_contents=None,
                      logfile=sys.stdout, verbosity=0, use_mmap=USE_MMAP,
@@ -645,7 +695,7 @@ class Book(BaseObject):
                     raise XLRDError("Can't find workbook in OLE2 compound document")
                 self.stream_len = len(self.mem)
             del cd
-            if self.mem is not self.filestr:
+            if self.mem is not self.filestr and not isinstance(self.mem, compdoc.CompDocStream):
                 if hasattr(self.filestr, "close"):
                     self.filestr.close()
                 self.filestr = b''
@@ -697,6 +747,8 @@ class Book(BaseObject):
     def get_sheet(self, sh_number, update_pos=True):
         if self._resources_released:
             raise XLRDError("Can't load sheets after releasing resources.")
+        if self._sheet_loader is not None:
+            return self._sheet_loader.get_sheet(sh_number)
         if update_pos:
             self._position = self._sh_abs_posn[sh_number]
         self.getbof(XL_WORKSHEET)
@@ -715,11 +767,13 @@ class Book(BaseObject):
         self._sheet_list[sh_number] = sh
         return sh
 
-    def get_sheets(self):
+    def get_sheets(self, sheet_filter=None):
         # DEBUG = 0
         if DEBUG: print("GET_SHEETS:", self._sheet_names, self._sh_abs_posn, file=self.logfile)
         for sheetno in xrange(len(self._sheet_names)):
             if DEBUG: print("GET_SHEETS: sheetno =", sheetno, self._sheet_names, self._sh_abs_posn, file=self.logfile)
+            if sheet_filter is not None and not sheet_filter(self._sheet_names[sheetno]):
+                continue
             self.get_sheet(sheetno)
 
     def fake_globals_get_sheet(self): # for BIFF 4.0 and earlier
@@ -1380,6 +1434,9 @@ def display_cell_address(rowx, colx, relrow, relcol):
         colpart = "$" + colname(colx)
     return colpart + rowpart
 
+# nchars and options of a SST string
+unpack_SST_string_header = struct.Struct('<HB').unpack_from
+
 def unpack_SST_table(datatab, nstrings):
     "Return list of strings"
     datainx = 0
@@ -1391,70 +1448,77 @@ def unpack_SST_table(datatab, nstrings):
     strappend = strings.append
     richtext_runs = {}
     local_unpack = unpack
+    local_unpack_header = unpack_SST_string_header
     local_min = min
     local_BYTES_ORD = BYTES_ORD
     latin_1 = "latin_1"
+    utf_16_le = "utf_16_le"
     for _unused_i in xrange(nstrings):
-        nchars = local_unpack('<H', data[pos:pos+2])[0]
-        pos += 2
-        options = local_BYTES_ORD(data[pos])
-        pos += 1
-        rtcount = 0
-        phosz = 0
-        if options & 0x08: # richtext
-            rtcount = local_unpack('<H', data[pos:pos+2])[0]
-            pos += 2
-        if options & 0x04: # phonetic
-            phosz = local_unpack('<i', data[pos:pos+4])[0]
-            pos += 4
-        accstrg = UNICODE_LITERAL('')
-        charsgot = 0
-        while 1:
-            charsneed = nchars - charsgot
-            if options & 0x01:
-                # Uncompressed UTF-16
-                charsavail = local_min((datalen - pos) >> 1, charsneed)
-                rawstrg = data[pos:pos+2*charsavail]
-                # if DEBUG: print "SST U16: nchars=%d pos=%d rawstrg=%r" % (nchars, pos, rawstrg)
-                try:
-                    accstrg += unicode(rawstrg, "utf_16_le")
-                except:
-                    # print "SST U16: nchars=%d pos=%d rawstrg=%r" % (nchars, pos, rawstrg)
-                    # Probable cause: dodgy data e.g. unfinished surrogate pair.
-                    # E.g. file unicode2.xls in pyExcelerator's examples has cells containing
-                    # unichr(i) for i in range(0x100000)
-                    # so this will include 0xD800 etc
-                    raise
-                pos += 2*charsavail
-            else:
-                # Note: this is COMPRESSED (not ASCII!) encoding!!!
-                charsavail = local_min(datalen - pos, charsneed)
-                rawstrg = data[pos:pos+charsavail]
-                # if DEBUG: print "SST CMPRSD: nchars=%d pos=%d rawstrg=%r" % (nchars, pos, rawstrg)
-                accstrg += unicode(rawstrg, latin_1)
-                pos += charsavail
-            charsgot += charsavail
-            if charsgot == nchars:
-                break
-            datainx += 1
-            data = datatab[datainx]
-            datalen = len(data)
-            options = local_BYTES_ORD(data[0])
-            pos = 1
-
-        if rtcount:
-            runs = []
-            for runindex in xrange(rtcount):
-                if pos == datalen:
-                    pos = 0
-                    datainx += 1
-                    data = datatab[datainx]
-                    datalen = len(data)
-                runs.append(local_unpack("<HH", data[pos:pos+4]))
+        nchars, options = local_unpack_header(data, pos)
+        pos += 3
+        end = pos + (nchars << (options & 0x01))
+        if not options & 0x0C and end <= datalen:
+            # Most strings have no richtext or phonetic data and are not
+            # split by a CONTINUE record: decode them from one slice.
+            accstrg = data[pos:end].decode(utf_16_le if options & 0x01 else latin_1)
+            pos = end
+        else:
+            rtcount = 0
+            phosz = 0
+            if options & 0x08: # richtext
+                rtcount = local_unpack('<H', data[pos:pos+2])[0]
+                pos += 2
+            if options & 0x04: # phonetic
+                phosz = local_unpack('<i', data[pos:pos+4])[0]
                 pos += 4
-            richtext_runs[len(strings)] = runs
-
-        pos += phosz # size of the phonetic stuff to skip
+            accstrg = UNICODE_LITERAL('')
+            charsgot = 0
+            while 1:
+                charsneed = nchars - charsgot
+                if options & 0x01:
+                    # Uncompressed UTF-16
+                    charsavail = local_min((datalen - pos) >> 1, charsneed)
+                    rawstrg = data[pos:pos+2*charsavail]
+                    # if DEBUG: print "SST U16: nchars=%d pos=%d rawstrg=%r" % (nchars, pos, rawstrg)
+                    try:
+                        accstrg += unicode(rawstrg, "utf_16_le")
+                    except:
+                        # print "SST U16: nchars=%d pos=%d rawstrg=%r" % (nchars, pos, rawstrg)
+                        # Probable cause: dodgy data e.g. unfinished surrogate pair.
+                        # E.g. file unicode2.xls in pyExcelerator's examples has cells containing
+                        # unichr(i) for i in range(0x100000)
+                        # so this will include 0xD800 etc
+                        raise
+                    pos += 2*charsavail
+                else:
+                    # Note: this is COMPRESSED (not ASCII!) encoding!!!
+                    charsavail = local_min(datalen - pos, charsneed)
+                    rawstrg = data[pos:pos+charsavail]
+                    # if DEBUG: print "SST CMPRSD: nchars=%d pos=%d rawstrg=%r" % (nchars, pos, rawstrg)
+                    accstrg += unicode(rawstrg, latin_1)
+                    pos += charsavail
+                charsgot += charsavail
+                if charsgot == nchars:
+                    break
+                datainx += 1
+                data = datatab[datainx]
+                datalen = len(data)
+                options = local_BYTES_ORD(data[0])
+                pos = 1
+
+            if rtcount:
+                runs = []
+                for runindex in xrange(rtcount):
+                    if pos == datalen:
+                        pos = 0
+                        datainx += 1
+                        data = datatab[datainx]
+                        datalen = len(data)
+                    runs.append(local_unpack("<HH", data[pos:pos+4]))
+                    pos += 4
+                richtext_runs[len(strings)] = runs
+
+            pos += phosz # size of the phonetic stuff to skip
         if pos >= datalen:
             # adjust to correct position in next record
             pos = pos - datalen
@@ -13,6 +13,7 @@ from __future__ import print_function
 
 import array
 import sys
+from bisect import bisect_right
 from struct import unpack
 
 from .timemachine import *
@@ -380,8 +381,9 @@ class CompDoc(object):
         byte sequence (``mem``) used when the document was opened,
         then ``(mem, offset_to_start_of_stream, length_of_stream)`` is returned.
 
-        Otherwise a new string is built from the fragments and
-        ``(new_string, 0, length_of_stream)`` is returned.
+        Otherwise ``(stream, 0, length_of_stream)`` is returned, where
+        ``stream`` is a :class:`CompDocStream` that reads the fragments in
+        place when it is sliced.
 
         :param qname:
           Name of the desired stream e.g. ``'Workbook'``.
@@ -453,7 +455,80 @@ class CompDoc(object):
             return (mem, start_pos, expected_stream_size)
         slices.append((start_pos, end_pos))
         # print >> self.logfile, "+++>>> %d fragments" % len(slices)
-        return (b''.join(mem[start_pos:end_pos] for start_pos, end_pos in slices), 0, expected_stream_size)
+        return (CompDocStream(mem, slices, expected_stream_size), 0, expected_stream_size)
+
+class CompDocStream(object):
+    """
+    A stream that is not contiguous in the ``mem`` of its compound document,
+    read in place from its runs of contiguous sectors. Slicing it returns the
+    same bytes as slicing the joined stream, only the sectors in the slice
+    are copied.
+    """
+
+    def __init__(self, mem, slices, size):
+        self.mem = mem
+        self.size = size
+        #: ``(start_pos, end_pos)`` in ``mem`` of each run of sectors.
+        self.slices = slices
+        #: The offset in the stream of each run.
+        self.starts = []
+        pos = 0
+        for start_pos, end_pos in slices:
+            self.starts.append(pos)
+            pos += end_pos - start_pos
+        # Records are read in order, so a slice is first looked for in the
+        # run of the last slice, without a bisect.
+        self.run_start = self.run_stop = self.run_offset = 0
+        if slices:
+            self.set_run(0)
+
+    def set_run(self, i):
+        self.run_start = self.starts[i]
+        self.run_stop = min(self.starts[i] + self.slices[i][1] - self.slices[i][0], self.size)
+        self.run_offset = self.slices[i][0] - self.starts[i]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) and index.step is None:
+            start = index.start
+            stop = index.stop
+            try:
+                if self.run_start <= start <= stop <= self.run_stop:
+                    offset = self.run_offset
+                    return self.mem[start+offset:stop+offset]
+            except TypeError: # an open slice, read in the general case
+                pass
+        if not isinstance(index, slice):
+            if index < 0:
+                index += self.size
+            if not 0 <= index < self.size:
+                raise IndexError("CompDocStream index out of range")
+            i = bisect_right(self.starts, index) - 1
+            return self.mem[self.slices[i][0] + index - self.starts[i]]
+        start, stop, step = index.indices(self.size)
+        if step != 1:
+            return self[start:stop][::step]
+        parts = []
+        i = bisect_right(self.starts, start) - 1
+        while start < stop:
+            mpos = self.slices[i][0] + start - self.starts[i]
+            grab = min(stop - start, self.slices[i][1] - mpos)
+            part = self.mem[mpos:mpos+grab]
+            parts.append(part)
+            self.set_run(i)
+            if len(part) < grab: # truncated file
+                break
+            start += grab
+            i += 1
+        if len(parts) == 1:
+            return parts[0]
+        return b''.join(parts)
+
+    def close(self):
+        if hasattr(self.mem, "close"):
+            self.mem.close()
 
 # ==========================================================================================
 def x_dump_line(alist, stride, f, dpos, equal=0):
@@ -6,7 +6,8 @@
 from __future__ import print_function
 
 from array import array
-from struct import calcsize, unpack
+from bisect import bisect_right
+from struct import calcsize, pack, unpack
 
 from .biffh import *
 from .formatting import Format, nearest_colour_index
@@ -47,7 +48,256 @@ _WINDOW2_options = (
 
 
 
-class Sheet(BaseObject):
+class MergedCellLookup(object):
+    """
+    Looks up the merged range covering a cell, for classes with a
+    ``merged_cells`` list and the ``_merged_cell_map`` and
+    ``_merged_big_ranges`` index built by :meth:`put_merged_range`.
+    """
+
+    # When not None, the ranges are indexed by column instead of cell by
+    # cell: colx -> ([rlo, ...], [crange, ...]) in rlo order.
+    _merged_col_index = None
+
+    def merged_range(self, rowx, colx):
+        """
+        Returns the ``(rlo, rhi, clo, chi)`` tuple from :attr:`merged_cells`
+        that covers the given cell, or ``None`` if the cell is not merged.
+        This is a dictionary lookup, not a scan of :attr:`merged_cells`.
+        """
+        crange = self._merged_cell_map.get((rowx, colx))
+        if crange is None and self._merged_col_index is not None:
+            entry = self._merged_col_index.get(colx)
+            if entry is not None:
+                i = bisect_right(entry[0], rowx) - 1
+                if i >= 0 and rowx < entry[1][i][1]:
+                    return entry[1][i]
+        if crange is None and self._merged_big_ranges:
+            for big in self._merged_big_ranges:
+                if big[0] <= rowx < big[1] and big[2] <= colx < big[3]:
+                    return big
+        return crange
+
+    def merged_span(self, rowx, colx):
+        """
+        Returns ``(nrows, ncols)``, the size of the merged range covering
+        the given cell, or ``(1, 1)`` if the cell is not merged.
+        """
+        crange = self.merged_range(rowx, colx)
+        if crange is None:
+            return (1, 1)
+        return (crange[1] - crange[0], crange[3] - crange[2])
+
+    # === Following methods are used in building the lookup.
+    # === They are not part of the API.
+
+    #: Merged ranges covering more cells than this are kept in a short list
+    #: instead of being entered cell by cell in the lookup map.
+    merged_map_max_area = 4096
+
+    def put_merged_range(self, crange):
+        self.merged_cells.append(crange)
+        self.index_merged_range(crange)
+
+    def index_merged_range(self, crange):
+        rlo, rhi, clo, chi = crange
+        col_index = self._merged_col_index
+        if col_index is not None:
+            for colx in xrange(clo, chi):
+                starts, cranges = col_index.setdefault(colx, ([], []))
+                i = bisect_right(starts, rlo)
+                starts.insert(i, rlo)
+                cranges.insert(i, crange)
+            return
+        if (rhi - rlo) * (chi - clo) > self.merged_map_max_area:
+            self._merged_big_ranges.append(crange)
+            return
+        cmap = self._merged_cell_map
+        for rowx in xrange(rlo, rhi):
+            for colx in xrange(clo, chi):
+                cmap[(rowx, colx)] = crange
+
+
+
+class _NoValue(object):
+    # unpickled as the same object, for the sheets of sheet_jobs worker processes
+    def __reduce__(self):
+        return '_NO_VALUE'
+
+_NO_VALUE = _NoValue() # marks the rows of a ColumnStore object list without a value
+
+class ColumnStore(object):
+    """
+    The cells of a sheet kept by column, used when the workbook is opened
+    with ``compact_cells=True``.
+
+    Each column has an ``array('B')`` of cell types as long as its last
+    stored cell. Numbers and dates are kept in an ``array('d')``; text,
+    booleans and error codes are kept in a list, with equal strings shared.
+    Empty and blank cells only have their type. The :attr:`values`,
+    :attr:`types` and :attr:`xf_indexes` views are indexed like the lists of
+    rows that a :class:`Sheet` keeps otherwise.
+    """
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.col_types = [] # array('B') per column
+        self.col_numbers = [] # array('d') or None per column
+        self.col_objects = [] # list or None per column
+        self.col_xf_indexes = [] # array('h') per column, with formatting_info
+        self.row_lens = array('i') # the colx after the last stored cell of each row
+        self.strings = {} # for sharing equal strings while the sheet is built
+        self.values = ColumnStoreRows(self, self.value, list)
+        self.types = ColumnStoreRows(self, self.cell_type, lambda seq: array('B', seq))
+        self.xf_indexes = ColumnStoreRows(self, self.xf_index, lambda seq: array('h', seq))
+
+    def value(self, rowx, colx):
+        if colx >= len(self.col_types):
+            return UNICODE_LITERAL('') # beyond the stored cells, see tidy_dimensions
+        objects = self.col_objects[colx]
+        if objects is not None and rowx < len(objects):
+            value = objects[rowx]
+            if value is not _NO_VALUE:
+                return value
+        types = self.col_types[colx]
+        if rowx >= len(types) or types[rowx] in (XL_CELL_EMPTY, XL_CELL_BLANK):
+            return UNICODE_LITERAL('')
+        return self.col_numbers[colx][rowx]
+
+    def cell_type(self, rowx, colx):
+        if colx >= len(self.col_types):
+            return XL_CELL_EMPTY
+        types = self.col_types[colx]
+        if rowx < len(types):
+            return types[rowx]
+        return XL_CELL_EMPTY
+
+    def xf_index(self, rowx, colx):
+        if colx >= len(self.col_xf_indexes):
+            return -1
+        xf_indexes = self.col_xf_indexes[colx]
+        if rowx < len(xf_indexes):
+            return xf_indexes[rowx]
+        return -1
+
+    def row_len(self, rowx):
+        if self.sheet.ragged_rows:
+            return self.row_lens[rowx]
+        return self.sheet.ncols
+
+    def put_cell(self, rowx, colx, ctype, value, xf_index):
+        sheet = self.sheet
+        if ctype is None:
+            # we have a number, so look up the cell type
+            ctype = sheet._xf_index_to_xl_type_map[xf_index]
+        assert 0 <= colx < sheet.utter_max_cols
+        assert 0 <= rowx < sheet.utter_max_rows
+        fmt_info = sheet.formatting_info
+        col_types = self.col_types
+        if colx >= len(col_types):
+            for _unused in xrange(len(col_types), colx + 1):
+                col_types.append(array('B'))
+                self.col_numbers.append(None)
+                self.col_objects.append(None)
+                if fmt_info:
+                    self.col_xf_indexes.append(array('h'))
+        if colx >= sheet.ncols:
+            sheet.ncols = colx + 1
+        row_lens = self.row_lens
+        if rowx >= len(row_lens):
+            row_lens.extend(array('i', [0]) * (rowx + 1 - len(row_lens)))
+        if rowx >= sheet.nrows:
+            sheet.nrows = rowx + 1
+        if colx >= row_lens[rowx]:
+            row_lens[rowx] = colx + 1
+
+        types = col_types[colx]
+        nextra = rowx + 1 - len(types)
+        if nextra > 0:
+            types.extend(sheet.bt * nextra)
+        types[rowx] = ctype
+        if fmt_info:
+            xf_indexes = self.col_xf_indexes[colx]
+            nextra = rowx + 1 - len(xf_indexes)
+            if nextra > 0:
+                xf_indexes.extend(sheet.bf * nextra)
+            xf_indexes[rowx] = xf_index
+
+        objects = self.col_objects[colx]
+        if type(value) is float:
+            numbers = self.col_numbers[colx]
+            if numbers is None:
+                numbers = self.col_numbers[colx] = array('d')
+            nextra = rowx + 1 - len(numbers)
+            if nextra > 0:
+                numbers.extend(array('d', [0.0]) * nextra)
+            numbers[rowx] = value
+        elif ctype in (XL_CELL_EMPTY, XL_CELL_BLANK) and value == '':
+            pass
+        else:
+            if isinstance(value, EXCEL_TEXT_TYPES):
+                value = self.strings.setdefault(value, value)
+            if objects is None:
+                objects = self.col_objects[colx] = []
+            nextra = rowx + 1 - len(objects)
+            if nextra > 0:
+                objects.extend([_NO_VALUE] * nextra)
+            objects[rowx] = value
+            return
+        if objects is not None and rowx < len(objects):
+            objects[rowx] = _NO_VALUE # the cell is put again
+
+
+class ColumnStoreRows(object):
+    """
+    A view of one kind of cell data of a :class:`ColumnStore`, indexed by
+    row and then by column like a list of lists.
+    """
+
+    def __init__(self, store, get, make):
+        self.store = store
+        self.get = get
+        self.make = make # builds a slice of a row from a list
+
+    def __len__(self):
+        return self.store.sheet.nrows
+
+    def __getitem__(self, rowx):
+        nrows = self.store.sheet.nrows
+        if rowx < 0:
+            rowx += nrows
+        if not 0 <= rowx < nrows:
+            raise IndexError('list index out of range')
+        return ColumnStoreRow(self, rowx)
+
+
+class ColumnStoreRow(object):
+
+    __slots__ = ['rows', 'rowx']
+
+    def __init__(self, rows, rowx):
+        self.rows = rows
+        self.rowx = rowx
+
+    def __len__(self):
+        return self.rows.store.row_len(self.rowx)
+
+    def __getitem__(self, colx):
+        rows = self.rows
+        rowx = self.rowx
+        ncols = rows.store.row_len(rowx)
+        if isinstance(colx, slice):
+            get = rows.get
+            return rows.make([get(rowx, x) for x in xrange(*colx.indices(ncols))])
+        if colx < 0:
+            colx += ncols
+        if not 0 <= colx < ncols:
+            raise IndexError('list index out of range')
+        return rows.get(rowx, colx)
+
+
+
+class Sheet(MergedCellLookup, BaseObject):
     """
     Contains the data for one worksheet.
 
@@ -328,10 +578,16 @@ class Sheet(BaseObject):
         self.verbosity = book.verbosity
         self.formatting_info = book.formatting_info
         self.ragged_rows = book.ragged_rows
+        self.compact_cells = book.compact_cells
+        self.preallocate_cells = (
+            book.preallocate_cells and not self.ragged_rows and not self.compact_cells)
         if self.ragged_rows:
             self.put_cell = self.put_cell_ragged
         else:
             self.put_cell = self.put_cell_unragged
+        if self.preallocate_cells:
+            self.put_cell = self.put_cell_preallocated
+        self._preallocated = None # (nrows, ncols) of the rows stored by preallocate
         self._xf_index_to_xl_type_map = book._xf_index_to_xl_type_map
         self.nrows = 0 # actual, including possibly empty cells
         self.ncols = 0
@@ -342,6 +598,14 @@ class Sheet(BaseObject):
         self._cell_values = []
         self._cell_types = []
         self._cell_xf_indexes = []
+        if self.compact_cells:
+            self._merged_col_index = {}
+            store = ColumnStore(self)
+            self.put_cell = store.put_cell
+            self._cell_values = store.values
+            self._cell_types = store.types
+            self._cell_xf_indexes = store.xf_indexes
+            self._cell_store = store
         self.defcolwidth = None
         self.standardwidth = None
         self.default_row_height = None
@@ -354,6 +618,8 @@ class Sheet(BaseObject):
         self.col_label_ranges = []
         self.row_label_ranges = []
         self.merged_cells = []
+        self._merged_cell_map = {} # (rowx, colx) -> crange, see put_merged_range
+        self._merged_big_ranges = [] # ranges too large to be mapped cell by cell
         self.rich_text_runlist_map = {}
         self.horizontal_page_breaks = []
         self.vertical_page_breaks = []
@@ -580,6 +846,10 @@ class Sheet(BaseObject):
                 "tidy_dimensions: nrows=%d ncols=%d \n",
                 self.nrows, self.ncols,
             )
+        if self._preallocated is not None:
+            # all the cells were in the dimension, the rows are full
+            self.trim_preallocated()
+            self._first_full_rowx = 0
         if 1 and self.merged_cells:
             nr = nc = 0
             umaxrows = self.utter_max_rows
@@ -612,7 +882,10 @@ class Sheet(BaseObject):
                 self.nrows,
                 self.ncols,
             )
-        if not self.ragged_rows:
+        if self.compact_cells:
+            # the rows of a ColumnStore are padded when they are read
+            self._cell_store.strings = {}
+        elif not self.ragged_rows:
             # fix ragged rows
             ncols = self.ncols
             s_cell_types = self._cell_types
@@ -634,6 +907,60 @@ class Sheet(BaseObject):
                     if s_fmt_info:
                         s_cell_xf_indexes[rowx][rlen:] = self.bf * nextra
 
+    #: A dimension with more cells than this is not preallocated, as it may
+    #: be wrong.
+    preallocate_max_cells = 1 << 22
+
+    def preallocate(self, nrows, ncols):
+        """
+        Stores ``nrows`` rows of ``ncols`` empty cells, from the dimension
+        of the sheet, before its cells are put. Only used with
+        ``preallocate_cells``.
+        """
+        if (not self.preallocate_cells or self._cell_types
+                or not 0 < nrows <= self.utter_max_rows
+                or not 0 < ncols <= self.utter_max_cols
+                or nrows * ncols > self.preallocate_max_cells):
+            return
+        self._cell_types = [self.bt * ncols for _unused in xrange(nrows)]
+        self._cell_values = [[UNICODE_LITERAL('')] * ncols for _unused in xrange(nrows)]
+        if self.formatting_info:
+            self._cell_xf_indexes = [self.bf * ncols for _unused in xrange(nrows)]
+        self._preallocated = (nrows, ncols)
+
+    def trim_preallocated(self):
+        # Cuts the preallocated rows to nrows by ncols, the rows that
+        # put_cell_unragged would have stored.
+        nrows, ncols = self.nrows, self.ncols
+        for rows in (self._cell_types, self._cell_values, self._cell_xf_indexes):
+            del rows[nrows:]
+            if ncols < self._preallocated[1]:
+                for row in rows:
+                    del row[ncols:]
+        self._preallocated = None
+
+    def put_cell_preallocated(self, rowx, colx, ctype, value, xf_index):
+        dims = self._preallocated
+        if dims is not None and rowx < dims[0] and colx < dims[1]:
+            if ctype is None:
+                # we have a number, so look up the cell type
+                ctype = self._xf_index_to_xl_type_map[xf_index]
+            self._cell_types[rowx][colx] = ctype
+            self._cell_values[rowx][colx] = value
+            if self.formatting_info:
+                self._cell_xf_indexes[rowx][colx] = xf_index
+            if rowx >= self.nrows:
+                self.nrows = rowx + 1
+            if colx >= self.ncols:
+                self.ncols = colx + 1
+            return
+        if dims is not None:
+            # The cell is outside the dimension: go on as if it had not
+            # been used. tidy_dimensions checks all the rows.
+            self.trim_preallocated()
+            self._first_full_rowx = -2
+        self.put_cell_unragged(rowx, colx, ctype, value, xf_index)
+
     def put_cell_ragged(self, rowx, colx, ctype, value, xf_index):
         if ctype is None:
             # we have a number, so look up the cell type
@@ -768,6 +1095,20 @@ class Sheet(BaseObject):
 
     # === Methods after this line neither know nor care about how cells are stored.
 
+    def column_filtered_put_cell(self, column_filter):
+        # Cells of the same row are next to each other in the stream, the
+        # columns of the row are looked up once.
+        put_cell = self.put_cell
+        state = [-1, None] # rowx, columns
+        def put_filtered_cell(rowx, colx, ctype, value, xf_index):
+            if rowx != state[0]:
+                state[0] = rowx
+                state[1] = column_filter(self, rowx)
+            columns = state[1]
+            if columns is None or colx in columns:
+                put_cell(rowx, colx, ctype, value, xf_index)
+        return put_filtered_cell
+
     def read(self, bk):
         global rc_stats
         DEBUG = 0
@@ -782,6 +1123,8 @@ class Sheet(BaseObject):
             XL_ARRAY2, XL_TABLEOP_B2,
         )
         self_put_cell = self.put_cell
+        if bk.column_filter is not None:
+            self_put_cell = self.column_filtered_put_cell(bk.column_filter)
         local_unpack = unpack
         bk_get_record_parts = bk.get_record_parts
         bv = self.biff_version
@@ -850,11 +1193,8 @@ class Sheet(BaseObject):
             elif rc == XL_MULRK:
                 mulrk_row, mulrk_first = local_unpack('<HH', data[0:4])
                 mulrk_last, = local_unpack('<H', data[-2:])
-                pos = 4
-                for colx in xrange(mulrk_first, mulrk_last+1):
-                    xf_index, = local_unpack('<H', data[pos:pos+2])
-                    d = unpack_RK(data[pos+2:pos+6])
-                    pos += 6
+                xf_indexes, values = unpack_RK_run(data, 4, mulrk_last - mulrk_first + 1)
+                for colx, xf_index, d in zip(xrange(mulrk_first, mulrk_last+1), xf_indexes, values):
                     self_put_cell(mulrk_row, colx, None, d, xf_index)
             elif rc == XL_ROW:
                 # Version 0.6.0a3: ROW records are just not worth using (for memory allocation).
@@ -961,7 +1301,7 @@ class Sheet(BaseObject):
                                 raise XLRDError("Expected STRING record; found 0x%04x" % rc2)
                         # if DEBUG: print "STRING: data=%r BIFF=%d cp=%d" % (data2, self.biff_version, bk.encoding)
                         strg = self.string_record_contents(data2)
-                        self.put_cell(rowx, colx, XL_CELL_TEXT, strg, xf_index)
+                        self_put_cell(rowx, colx, XL_CELL_TEXT, strg, xf_index)
                         # if DEBUG: print "FORMULA strg %r" % strg
                     elif first_byte == 1:
                         # boolean formula result
@@ -1076,6 +1416,7 @@ class Sheet(BaseObject):
                     dim_tuple = local_unpack('<ixxH', data[4:12])
                 self.nrows, self.ncols = 0, 0
                 self._dimnrows, self._dimncols = dim_tuple
+                self.preallocate(*dim_tuple)
                 if bv in (21, 30, 40) and self.book.xf_list and not self.book._xf_epilogue_done:
                     self.book.xf_epilogue()
                 if blah:
@@ -1241,8 +1582,11 @@ class Sheet(BaseObject):
                 self.default_additional_space_below = (bits >> 3) & 1
             elif rc == XL_MERGEDCELLS:
                 if not fmt_info: continue
+                nmerged = len(self.merged_cells)
                 pos = unpack_cell_range_address_list_update_pos(
                     self.merged_cells, data, 0, bv, addr_size=8)
+                for crange in self.merged_cells[nmerged:]:
+                    self.index_merged_range(crange)
                 if blah:
                     fprintf(self.logfile,
                         "MERGEDCELLS: %d ranges\n", (pos - 2) // 8)
@@ -2092,6 +2436,92 @@ class Sheet(BaseObject):
                 cchStmCache, lem, rgbHashParam, cchName), file=self.logfile)
 
 
+class SheetRows(MergedCellLookup, BaseObject):
+    """
+    The rows of one worksheet, read one at a time by iterating this object.
+    See :meth:`xlrd.book.Book.iter_sheet_rows`.
+
+    Each row is a list of cell values, as :meth:`Sheet.row_values` gives
+    for a sheet opened with ``ragged_rows=True``: it ends at the last cell
+    stored in the row, and rows without cells are empty lists. As in a
+    :class:`Sheet`, the rows after the last cell are not yielded. The merged
+    ranges of the sheet are known before the first row is read, and the
+    rows they cover are all yielded. The rows can be iterated once.
+    """
+
+    def __init__(self, book, name='', number=0):
+        #: A reference to the :class:`~xlrd.book.Book` object to which this
+        #: sheet belongs.
+        self.book = book
+
+        #: Name of the sheet.
+        self.name = name
+
+        #: Sheet index in ``range(book.nsheets)``.
+        self.number = number
+
+        #: Number of rows yielded so far.
+        self.nrows = 0
+
+        #: List of the sheet's merged ranges, in the form of
+        #: :attr:`Sheet.merged_cells`.
+        self.merged_cells = []
+
+        #: If not ``None``, the collection of the column indexes read for the
+        #: rows that follow; the other cells are left as empty strings.
+        #: It may be changed while the rows are iterated. xlsx only.
+        self.columns = None
+
+        self._merged_cell_map = {}
+        self._merged_big_ranges = []
+        self._dimnrows = 0
+        self._dimncols = 0
+        self._row = [] # values of the row being read
+        self._finished = [] # (rowx, values) of the rows read but not yielded
+        self._source = None
+
+    def put_cell(self, rowx, colx, ctype, value, xf_index):
+        row = self._row
+        if colx >= len(row):
+            row.extend([UNICODE_LITERAL('')] * (colx + 1 - len(row)))
+        row[colx] = value
+
+    def finish_row(self, rowx):
+        self._finished.append((rowx, self._row))
+        self._row = []
+
+    def set_source(self, source):
+        # source yields (rowx, values) in row order
+        self._source = source
+
+    def __iter__(self):
+        return self._iter_rows()
+
+    def _iter_rows(self):
+        for rowx, row in self._source or ():
+            if not row:
+                continue # yielded as a gap if a later row has cells
+            if rowx < self.nrows:
+                raise XLRDError('sheet %r: row %d is out of order' % (self.name, rowx + 1))
+            while self.nrows < rowx:
+                self.nrows += 1
+                yield []
+            self.nrows = rowx + 1
+            yield row
+        nrows = max([crange[1] for crange in self.merged_cells] or [0])
+        while self.nrows < nrows:
+            self.nrows += 1
+            yield []
+
+    def close(self):
+        """
+        Stops reading the rows and releases the stream they are read from.
+        """
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+
 class MSODrawing(BaseObject):
     pass
 
@@ -2211,6 +2641,23 @@ def unpack_RK(rk_str):
             return d / 100.0
         return d
 
+def unpack_RK_run(data, pos, n):
+    """
+    Returns the xf indexes and the values of the ``n`` (xf_index, RK) pairs
+    at ``data[pos:]``, as in a MULRK record. The pairs are unpacked with one
+    call, and the RK values that hold the top 30 bits of a double are turned
+    into doubles with one more.
+    """
+    fields = unpack('<' + 'Hi' * n, data[pos:pos+6*n])
+    rks = fields[1::2]
+    # rk & -4 clears the flag bits; its bits are the high half of the double
+    doubles = unpack('<%dd' % n, pack('<%dq' % n, *[(rk & -4) << 32 for rk in rks]))
+    values = [
+        ((rk >> 2) if rk & 2 else d) / 100.0 if rk & 1 else
+        float(rk >> 2) if rk & 2 else d
+        for rk, d in zip(rks, doubles)]
+    return fields[0::2], values
+
 ##### =============== Cell ======================================== #####
 
 cellty_from_fmtty = {
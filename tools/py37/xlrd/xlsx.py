@@ -5,17 +5,23 @@
 
 from __future__ import print_function, unicode_literals
 
+import multiprocessing
 import re
 import sys
+import zipfile
+from array import array
+from collections import OrderedDict
 from os.path import join, normpath
+from xml.parsers import expat
 
 from .biffh import (
-    XL_CELL_BLANK, XL_CELL_BOOLEAN, XL_CELL_ERROR, XL_CELL_TEXT, XLRDError,
+    XL_CELL_BLANK, XL_CELL_BOOLEAN, XL_CELL_EMPTY, XL_CELL_ERROR, XL_CELL_TEXT,
+    XLRDError,
     error_text_from_code,
 )
 from .book import Book, Name
 from .formatting import XF, Format, is_date_format_string
-from .sheet import Sheet
+from .sheet import Sheet, SheetRows
 from .timemachine import *
 
 DEBUG = 0
@@ -133,6 +139,10 @@ V_TAG = U_SSML12 + 'v' # cell child: value
 F_TAG = U_SSML12 + 'f' # cell child: formula
 IS_TAG = U_SSML12 + 'is' # cell child: inline string
 
+# expat reports namespaced names as "uri}local"
+E_SSML12 = U_SSML12[1:]
+E_XML_SPACE_ATTR = XML_SPACE_ATTR[1:]
+
 def unescape(s,
              subber=re.compile(r'_x[0-9A-Fa-f]{4,4}_', re.UNICODE).sub,
              repl=lambda mobj: unichr(int(mobj.group(0)[2:6], 16))):
@@ -295,6 +305,13 @@ class X12Book(X12General):
         self.relid2reltype = {}
         self.sheet_targets = [] # indexed by sheetx
         self.sheetIds = [] # indexed by sheetx
+        self.zf = None
+        self.component_names = None
+        self.use_expat = False
+        self.max_rows = None
+        self.stop_row = None
+        self.detach_rows = False
+        self.minimal_metadata = False
 
     core_props_menu = {
         U_CP+"lastModifiedBy": ("last_modified_by", cnv_ST_Xstring),
@@ -395,10 +412,7 @@ class X12Book(X12General):
             'veryHidden': 2,
         }
         bk._sheet_visibility.append(visibility_map[state])
-        sheet = Sheet(bk, position=None, name=name, number=sheetx)
-        sheet.utter_max_rows = X12_MAX_ROWS
-        sheet.utter_max_cols = X12_MAX_COLS
-        bk._sheet_list.append(sheet)
+        bk._sheet_list.append(None) # filled in by get_sheet
         bk._sheet_names.append(name)
         bk.nsheets += 1
         self.sheet_targets.append(target)
@@ -411,6 +425,64 @@ class X12Book(X12General):
             self.dumpout('datemode=%r', datemode)
         self.bk.datemode = datemode
 
+    def get_sheet(self, sheetx):
+        bk = self.bk
+        zf = self.zf
+        component_names = self.component_names
+        fname = self.sheet_targets[sheetx]
+        sheet = Sheet(bk, position=None, name=bk._sheet_names[sheetx], number=sheetx)
+        sheet.utter_max_rows = X12_MAX_ROWS
+        sheet.utter_max_cols = X12_MAX_COLS
+        zflo = zf.open(component_names[fname])
+        x12sheet = X12Sheet(sheet, self.logfile, self.verbosity)
+        x12sheet.max_rows = self.max_rows
+        x12sheet.stop_row = self.stop_row
+        x12sheet.detach_rows = self.detach_rows
+        if self.use_expat:
+            x12sheet.process_stream = x12sheet.expat_process_stream
+        heading = "Sheet %r (sheetx=%d) from %r" % (sheet.name, sheetx, fname)
+        x12sheet.process_stream(zflo, heading)
+        del zflo
+
+        rels_fname = 'xl/worksheets/_rels/%s.rels' % fname.rsplit('/', 1)[-1]
+        if rels_fname in component_names and not self.minimal_metadata:
+            zfrels = zf.open(rels_fname)
+            x12sheet.process_rels(zfrels)
+            del zfrels
+
+        for relid, reltype in x12sheet.relid2reltype.items():
+            if reltype == 'comments':
+                comments_fname = x12sheet.relid2path.get(relid)
+                if comments_fname and comments_fname in component_names:
+                    comments_stream = zf.open(comments_fname)
+                    x12sheet.process_comments_stream(comments_stream)
+                    del comments_stream
+
+        sheet.tidy_dimensions()
+        bk._sheet_list[sheetx] = sheet
+        return sheet
+
+    def iter_sheet_rows(self, sheetx, merged_cells=True):
+        bk = self.bk
+        member = self.component_names[self.sheet_targets[sheetx]]
+        rows = SheetRows(bk, name=bk._sheet_names[sheetx], number=sheetx)
+        x12sheet = X12Sheet(rows, self.logfile, self.verbosity)
+        if merged_cells:
+            zflo = self.zf.open(member)
+            try:
+                x12sheet.scan_merge_cells(zflo)
+            finally:
+                zflo.close()
+        x12sheet.column_filter = lambda rows, rowx: rows.columns
+        rows.set_source(X12ExpatSheet(x12sheet).iter_rows(self.zf, member))
+        return rows
+
+    def release_resources(self):
+        if self.zf is not None:
+            self.zf.close()
+        self.zf = None
+        self.component_names = None
+
     tag2meth = {
         'definedNames':  do_defined_names,
         'workbookPr':   do_workbookpr,
@@ -467,6 +539,127 @@ class X12SST(X12General):
         if self.verbosity >= 2:
             self.dumpout('Entries in SST: %d', len(sst))
 
+# the array type of X12LazySST offsets, 'l' is only 32 bits on Windows
+try:
+    array('q')
+    SST_OFFSET_TYPECODE = 'q'
+except ValueError: # Python 2 has no 'q'
+    SST_OFFSET_TYPECODE = 'l'
+
+class X12LazySST(X12General):
+    """
+    Shared string table that is decoded on demand.
+
+    One regular-expression scan of ``xl/sharedStrings.xml`` records the byte
+    offset of each ``<si>`` element. A string is decoded the first time a cell
+    refers to it and kept in a least-recently-used cache of at most
+    :attr:`max_cached` entries. An ``<si>`` holding a single ``<t>`` of plain
+    text is decoded straight from its bytes; others, with rich text runs or
+    character references, are parsed with ElementTree. Installed as
+    ``bk._sharedstrings``; it supports ``len()`` and indexing like the list
+    built by :class:`X12SST`.
+    """
+
+    #: The maximum number of decoded strings kept in the cache.
+    max_cached = 16384
+
+    root_pattern = re.compile(br'<((?:[\w.-]+:)?sst)\b[^>]*>')
+    si_pattern = re.compile(br'<(?:[\w.-]+:)?si\b')
+    # an <si> with a single <t> whose text has no markup, character
+    # references or carriage returns (which the XML parser would normalise)
+    plain_si_pattern = re.compile(
+        br'<si>[ \t\n]*<t([ \t\n]+xml:space=(["\'])preserve\2)?[ \t\n]*'
+        br'(?:/>|>((?:[^<&\r]|&(?:amp|lt|gt|quot|apos);)*)</t>)[ \t\n]*</si>[ \t\n]*$')
+    plain_entities = {
+        '&amp;': '&', '&lt;': '<', '&gt;': '>', '&quot;': '"', '&apos;': "'",
+    }
+    plain_entity_pattern = re.compile(r'&(?:amp|lt|gt|quot|apos);')
+
+    def __init__(self, bk, logfile=DLF, verbosity=0):
+        self.bk = bk
+        self.logfile = logfile
+        self.verbosity = verbosity
+        self.data = b''
+        self.head = self.tail = b''
+        self.starts = array(SST_OFFSET_TYPECODE) # offset of each <si>, the next offset ends it
+        self.cache = OrderedDict()
+        self.plain = False # plain_si_pattern may be used
+
+    def process_stream(self, stream, heading=None):
+        if self.verbosity >= 2 and heading is not None:
+            fprintf(self.logfile, "\n=== %s ===\n", heading)
+        data = stream.read()
+        root = self.root_pattern.search(data)
+        if (root is None or data[:2] in (b'\xff\xfe', b'\xfe\xff') or
+                len(data) >= 1 << (8 * self.starts.itemsize - 1)):
+            # not the usual utf-8 layout, or too big for the offsets;
+            # decode everything up front
+            X12SST(self.bk, self.logfile, self.verbosity).process_stream(BYTES_IO(data), heading)
+            return
+        # each <si> is decoded inside the original root tag, to keep its namespaces
+        self.head = data[:root.end()]
+        self.tail = b'</' + root.group(1) + b'>'
+        # unprefixed <si> and <t> are only ours in the default namespace
+        self.plain = (root.group(1) == b'sst' and
+                      b'xmlns="' + U_SSML12[1:-1].encode('ascii') + b'"' in self.head)
+        starts = self.starts
+        starts.extend([match.start() for match in self.si_pattern.finditer(data, root.end())])
+        end = data.rfind(self.tail)
+        starts.append(end if end >= 0 else len(data))
+        self.data = data
+        self.bk._sharedstrings = self
+        if self.verbosity >= 2:
+            self.dumpout('Entries in SST: %d', len(self))
+
+    def __getstate__(self):
+        # sent to the sheet_jobs worker processes without the book
+        state = self.__dict__.copy()
+        state['bk'] = None
+        state['logfile'] = None
+        state['cache'] = OrderedDict()
+        return state
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, index):
+        cache = self.cache
+        result = cache.pop(index, None)
+        if result is None:
+            if not -len(self) <= index < len(self):
+                raise IndexError('shared string index out of range')
+            if index < 0:
+                index += len(self)
+            starts = self.starts
+            start, end = starts[index], starts[index + 1]
+            match = self.plain and self.plain_si_pattern.match(self.data, start, end)
+            if match:
+                result = self.plain_text(match)
+            else:
+                elem = ET.fromstring(self.head + self.data[start:end] + self.tail)[0]
+                result = get_text_from_si_or_is(self, elem)
+            if len(cache) >= self.max_cached:
+                cache.popitem(last=False)
+        cache[index] = result
+        return result
+
+    def __iter__(self):
+        for index in xrange(len(self)):
+            yield self[index]
+
+    def plain_text(self, match):
+        # the same text as cooked_text gives for the <t> element
+        text = match.group(3)
+        if not text:
+            return ''
+        text = text.decode('utf-8')
+        if '&' in text:
+            entities = self.plain_entities
+            text = self.plain_entity_pattern.sub(lambda m: entities[m.group(0)], text)
+        if match.group(1) is None:
+            text = text.strip(XML_WHITESPACE)
+        return ensure_unicode(unescape(text))
+
 class X12Styles(X12General):
 
     def __init__(self, bk, logfile=DLF, verbosity=0):
@@ -482,6 +675,26 @@ class X12Styles(X12General):
         self.bk._xf_index_to_xl_type_map[0] = 2
         # fill_in_standard_formats(bk) #### pre-integration kludge
 
+    root_pattern = re.compile(br'<((?:[\w.-]+:)?styleSheet)\b[^>]*>')
+    section_pattern = re.compile(
+        br'<((?:[\w.-]+:)?(?:numFmts|cellXfs))\b[^>]*?(?:/>|>.*?</\1>)', re.DOTALL)
+
+    def scan_stream(self, stream, heading=None):
+        """
+        Reads only the ``numFmts`` and ``cellXfs`` elements, the ones that
+        map XF indexes to cell types. They are found by a scan of the styles
+        part and parsed inside the original root tag, to keep its namespaces.
+        """
+        data = stream.read()
+        root = self.root_pattern.search(data)
+        if root is None or data[:2] in (b'\xff\xfe', b'\xfe\xff'):
+            # not the usual utf-8 layout; parse everything
+            self.process_stream(BYTES_IO(data), heading)
+            return
+        sections = b''.join(match.group(0) for match in self.section_pattern.finditer(data, root.end()))
+        tail = b'</' + root.group(1) + b'>'
+        self.process_stream(BYTES_IO(data[:root.end()] + sections + tail), heading)
+
     def do_cellstylexfs(self, elem):
         self.xf_type = 0
 
@@ -534,21 +747,56 @@ class X12Sheet(X12General):
         self.sst = self.bk._sharedstrings
         self.relid2path = {}
         self.relid2reltype = {}
-        self.merged_cells = sheet.merged_cells
         self.warned_no_cell_name = 0
         self.warned_no_row_num = 0
+        self.max_rows = None # stop reading at the first row beyond this count
+        self.stop_row = None # stop reading after a row for which this returns true
+        self.detach_rows = False # remove each row from <sheetData> once it is read
+        self.column_filter = self.bk.column_filter
         if ET_has_iterparse:
             self.process_stream = self.own_process_stream
 
+    def expat_process_stream(self, stream, heading=None):
+        if self.verbosity >= 2 and heading is not None:
+            fprintf(self.logfile, "\n=== %s ===\n", heading)
+        if self.stop_row is not None:
+            stream = X12RecordingStream(stream)
+        X12ExpatSheet(self).parse(stream)
+        self.finish_off()
+
     def own_process_stream(self, stream, heading=None):
         if self.verbosity >= 2 and heading is not None:
             fprintf(self.logfile, "\n=== %s ===\n", heading)
         row_tag = U_SSML12 + "row"
+        sheet_data_tag = U_SSML12 + "sheetData"
         self_do_row = self.do_row
-        for event, elem in ET.iterparse(stream):
+        max_rows = self.max_rows
+        stop_row = self.stop_row
+        if stop_row is not None:
+            stream = X12RecordingStream(stream)
+        # With detach_rows, the start of <sheetData> is caught so that the
+        # rows can be taken off it.
+        events = ('start', 'end') if self.detach_rows else ('end',)
+        sheet_data = None
+        for event, elem in ET.iterparse(stream, events):
+            if event == 'start':
+                if elem.tag == sheet_data_tag:
+                    sheet_data = elem
+                continue
             if elem.tag == row_tag:
+                if max_rows is not None:
+                    row_number = elem.get('r')
+                    rowx = self.rowx + 1 if row_number is None else int(row_number) - 1
+                    if rowx >= max_rows:
+                        self.do_row_limit()
+                        break # the rest of the sheet is not read
                 self_do_row(elem)
                 elem.clear() # destroy all child elements (cells)
+                if sheet_data is not None:
+                    del sheet_data[:] # drop the rows read so far
+                if stop_row is not None and stop_row(self.sheet, self.rowx):
+                    self.skip_rows(stream)
+                    break
             elif elem.tag == U_SSML12 + "dimension":
                 self.do_dimension(elem)
             elif elem.tag == U_SSML12 + "mergeCell":
@@ -593,6 +841,39 @@ class X12Sheet(X12General):
                 note.text += cooked_text(self, t)
             cell_note_map[coords] = note
 
+    merge_cell_pattern = re.compile(br'<(?:[\w.-]+:)?mergeCell\b[^>]*>')
+    ref_attr_pattern = re.compile(br'\sref\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+    def skip_rows(self, stream):
+        # The rest of the rows are not parsed. The merged cells follow
+        # <sheetData>, so the rest of the part is only searched for them,
+        # starting with the chunks the parser has read but not reported.
+        self.scan_merge_cells(stream, b''.join(stream.chunks))
+
+    def scan_merge_cells(self, stream, tail=b''):
+        # Finds the <mergeCell> elements in the text of the part, the XML
+        # is not parsed.
+        while 1:
+            chunk = stream.read(X12RecordingStream.chunk_size)
+            data = tail + chunk
+            cut = data.rfind(b'<') if chunk else -1 # the last tag may be incomplete
+            if cut < 0:
+                cut = len(data)
+            for match in self.merge_cell_pattern.finditer(data, 0, cut):
+                ref = self.ref_attr_pattern.search(match.group())
+                if ref:
+                    ref = ref.group(1) if ref.group(1) is not None else ref.group(2)
+                    self.do_merge_cell({'ref': ref.decode('utf-8')})
+            if not chunk:
+                break
+            tail = data[cut:]
+
+    def do_row_limit(self):
+        # There are rows after the limit, so nrows is the limit as if
+        # they had been read; trailing empty rows are kept.
+        if self.sheet.nrows < self.max_rows:
+            self.sheet.put_cell(self.max_rows - 1, 0, XL_CELL_EMPTY, '', -1)
+
     def do_dimension(self, elem):
         ref = elem.get('ref') # example: "A1:Z99" or just "A1"
         if ref:
@@ -603,6 +884,11 @@ class X12Sheet(X12General):
             self.sheet._dimnrows = rowx + 1
             if colx is not None:
                 self.sheet._dimncols = colx + 1
+                if self.bk.preallocate_cells and isinstance(self.sheet, Sheet):
+                    nrows = rowx + 1
+                    if self.max_rows is not None:
+                        nrows = min(nrows, self.max_rows)
+                    self.sheet.preallocate(nrows, colx + 1)
 
     def do_merge_cell(self, elem):
         # The ref attribute should be a cell range like "B1:D5".
@@ -616,8 +902,8 @@ class X12Sheet(X12General):
                 last_cell_ref = ref
             first_rowx, first_colx = cell_name_to_rowx_colx(first_cell_ref)
             last_rowx, last_colx = cell_name_to_rowx_colx(last_cell_ref)
-            self.merged_cells.append((first_rowx, last_rowx + 1,
-                                      first_colx, last_colx + 1))
+            self.sheet.put_merged_range((first_rowx, last_rowx + 1,
+                                         first_colx, last_colx + 1))
 
     def do_row(self, row_elem):
 
@@ -640,6 +926,9 @@ class X12Sheet(X12General):
         if self.verbosity >= 3:
             self.dumpout("<row> row_number=%r rowx=%d explicit=%d",
                 row_number, self.rowx, explicit_row_number)
+        columns = None
+        if self.column_filter is not None:
+            columns = self.column_filter(self.sheet, rowx)
         letter_value = _UPPERCASE_1_REL_INDEX
         for cell_elem in row_elem:
             cell_name = cell_elem.get('r')
@@ -669,6 +958,8 @@ class X12Sheet(X12General):
                     raise Exception('Unexpected character %r in cell name %r' % (c, cell_name))
                 if explicit_row_number and cell_name[charx:] != row_number:
                     raise Exception('cell name %r but row number is %r' % (cell_name, row_number))
+            if columns is not None and colx not in columns:
+                continue
             xf_index = int(cell_elem.get('s', '0'))
             cell_type = cell_elem.get('t', 'n')
             tvalue = None
@@ -781,6 +1072,402 @@ class X12Sheet(X12General):
     }
     augment_keys(tag2meth, U_SSML12)
 
+class X12RowLimitReached(Exception):
+    pass
+
+class X12RowsStopped(Exception):
+    pass
+
+class X12RecordingStream(object):
+    """
+    Wraps a worksheet stream and keeps the last two chunks read from it,
+    they hold all the data a parser has read but not yet reported.
+    """
+
+    chunk_size = 1 << 16
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.chunks = [b'', b'']
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.chunks = [self.chunks[1], data]
+        return data
+
+class X12ExpatSheet(object):
+    """
+    Sheet parser built on :mod:`xml.parsers.expat` handlers.
+
+    Cells are decoded while the worksheet part is read and written straight
+    into the sheet, no element objects are created. The stored cells, and
+    the errors raised for malformed input, are the same as those of
+    :meth:`X12Sheet.do_row`.
+    """
+
+    known_cell_types = ('n', 's', 'str', 'b', 'e', 'inlineStr')
+
+    def __init__(self, x12sheet):
+        self.x12sheet = x12sheet
+        self.sheet = x12sheet.sheet
+        self.put_cell = x12sheet.sheet.put_cell
+        self.bk = x12sheet.bk
+        self.sst = x12sheet.sst
+        self.verbosity = x12sheet.verbosity
+        self.colx_from_letters = {} # e.g. "AB" => 27
+        self.depth = 0 # element depth inside the open <row>, 0 when outside
+        self.rowx = -1
+        self.colx = -1
+        self.row_number = None
+        self.explicit_row_number = 0
+        self.xf_index = 0
+        self.cell_type = None
+        self.tvalue = None
+        self.child = None # tag of the open child of the cell: 'v', 'is' or None
+        self.text = [] # character data of the open <v> or <t>
+        self.text_attrs = None
+        self.collecting = False
+        self.is_accum = []
+        self.r_depth = 0 # depth of an open <r> in <is>
+        self.t_depth = 0 # depth of an open <t> in <is>
+        self.columns = None # the columns stored of the open row, None for all
+        self.read_merged_cells = True
+        self.finish_row = None # called with rowx at the end of each row
+
+    def create_parser(self):
+        parser = expat.ParserCreate(None, '}')
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start_element
+        parser.EndElementHandler = self.end_element
+        parser.CharacterDataHandler = self.character_data
+        parser.EntityDeclHandler = self.entity_decl
+        return parser
+
+    def parse(self, stream):
+        parser = self.create_parser()
+        try:
+            parser.ParseFile(stream)
+        except X12RowLimitReached:
+            self.x12sheet.do_row_limit() # the rest of the sheet is not read
+        except X12RowsStopped:
+            self.x12sheet.skip_rows(stream)
+
+    def iter_rows(self, zf, member):
+        # Parses the part chunk by chunk into a SheetRows, yielding
+        # (rowx, values) for the rows completed by each chunk. Its merged
+        # cells have been read beforehand.
+        rows = self.sheet
+        self.read_merged_cells = False
+        self.finish_row = rows.finish_row
+        finished = rows._finished
+        parser = self.create_parser()
+        stream = zf.open(member)
+        try:
+            while 1:
+                data = stream.read(X12RecordingStream.chunk_size)
+                parser.Parse(data, not data)
+                if finished:
+                    batch = finished[:]
+                    del finished[:]
+                    for item in batch:
+                        yield item
+                if not data:
+                    break
+        finally:
+            stream.close()
+
+    def entity_decl(self, name, *args):
+        raise XLRDError('entity declaration %r is not allowed in a worksheet' % name)
+
+    def character_data(self, data):
+        if self.collecting:
+            self.text.append(data)
+
+    def get_text(self):
+        # like ElementTree's .text: the character data before the first child
+        self.collecting = False
+        return ''.join(self.text) or None
+
+    def cooked_text(self, text):
+        if text is None:
+            return ''
+        if self.text_attrs.get(E_XML_SPACE_ATTR) != 'preserve':
+            text = text.strip(XML_WHITESPACE)
+        return ensure_unicode(unescape(text))
+
+    def start_element(self, name, attrs):
+        self.collecting = False # text after a child is not part of .text
+        depth = self.depth
+        if not depth:
+            if name == E_SSML12 + 'row':
+                self.depth = 1
+                self.start_row(attrs)
+            elif name == E_SSML12 + 'dimension':
+                self.x12sheet.do_dimension(attrs)
+            elif name == E_SSML12 + 'mergeCell' and self.read_merged_cells:
+                self.x12sheet.do_merge_cell(attrs)
+            return
+        depth += 1
+        self.depth = depth
+        if depth == 2:
+            # a cell
+            cell_name = attrs.get('r')
+            if cell_name is None: # Yes, it's optional.
+                self.colx += 1
+                x12sheet = self.x12sheet
+                if self.verbosity and not x12sheet.warned_no_cell_name:
+                    x12sheet.dumpout("no cellname; assuming rowx=%d colx=%d", self.rowx, self.colx)
+                    x12sheet.warned_no_cell_name = 1
+            else:
+                letters = cell_name.rstrip('0123456789')
+                colx = self.colx_from_letters.get(letters)
+                row_digits = cell_name[len(letters):]
+                if colx is None or not row_digits or row_digits[0] == '0':
+                    colx = self.get_colx(cell_name)
+                elif self.explicit_row_number and row_digits != self.row_number:
+                    raise Exception('cell name %r but row number is %r' % (cell_name, self.row_number))
+                self.colx = colx
+            if self.columns is not None and self.colx not in self.columns:
+                self.cell_type = None # skipped with its children
+                return
+            self.xf_index = int(attrs.get('s', '0'))
+            cell_type = attrs.get('t', 'n')
+            self.cell_type = cell_type
+            self.tvalue = '#N/A' if cell_type == 'e' else None
+            self.child = None
+        elif depth == 3:
+            # a child of the cell
+            cell_type = self.cell_type
+            if cell_type not in self.known_cell_types:
+                return # reported when the cell ends
+            if name == E_SSML12 + 'v':
+                self.child = 'v'
+                self.text = []
+                self.text_attrs = attrs
+                self.collecting = True
+            elif name == E_SSML12 + 'f':
+                self.child = None
+            elif name == E_SSML12 + 'is' and cell_type == 'inlineStr':
+                self.child = 'is'
+                self.is_accum = []
+            else:
+                child_tag = '{' + name if '}' in name else name
+                if cell_type == 'n':
+                    raise Exception('unexpected tag %r' % child_tag)
+                raise Exception('cell type %s has unexpected child <%s> at rowx=%r colx=%r' % (cell_type, child_tag, self.rowx, self.colx))
+        elif self.child == 'is':
+            # the text of an inline string: <is><t> and <is><r><t>
+            if name == E_SSML12 + 't' and (depth == 4 or depth == self.r_depth + 1):
+                self.t_depth = depth
+                self.text = []
+                self.text_attrs = attrs
+                self.collecting = True
+            elif name == E_SSML12 + 'r' and depth == 4:
+                self.r_depth = depth
+
+    def end_element(self, name):
+        depth = self.depth
+        if not depth:
+            return
+        self.depth = depth - 1
+        if depth == 2:
+            self.end_cell()
+        elif depth == 1:
+            if self.finish_row is not None:
+                self.finish_row(self.rowx)
+            stop_row = self.x12sheet.stop_row
+            if stop_row is not None and stop_row(self.sheet, self.rowx):
+                raise X12RowsStopped
+        elif depth == 3:
+            child = self.child
+            if child == 'v':
+                text = self.get_text()
+                self.tvalue = self.cooked_text(text) if self.cell_type == 'str' else text
+            elif child == 'is':
+                self.tvalue = ''.join(self.is_accum)
+            self.child = None
+        elif depth == self.t_depth:
+            self.t_depth = 0
+            text = self.cooked_text(self.get_text())
+            if text:
+                self.is_accum.append(text)
+        elif depth == self.r_depth:
+            self.r_depth = 0
+        self.collecting = False
+
+    def start_row(self, attrs):
+        x12sheet = self.x12sheet
+        row_number = attrs.get('r')
+        max_rows = x12sheet.max_rows
+        if max_rows is not None:
+            rowx = x12sheet.rowx + 1 if row_number is None else int(row_number) - 1
+            if rowx >= max_rows:
+                raise X12RowLimitReached
+        if row_number is None: # Yes, it's optional.
+            x12sheet.rowx += 1
+            self.explicit_row_number = 0
+            if self.verbosity and not x12sheet.warned_no_row_num:
+                x12sheet.dumpout("no row number; assuming rowx=%d", x12sheet.rowx)
+                x12sheet.warned_no_row_num = 1
+        else:
+            x12sheet.rowx = int(row_number) - 1
+            self.explicit_row_number = 1
+        assert 0 <= x12sheet.rowx < X12_MAX_ROWS
+        self.row_number = row_number
+        self.rowx = x12sheet.rowx
+        self.colx = -1
+        if self.verbosity >= 3:
+            x12sheet.dumpout("<row> row_number=%r rowx=%d explicit=%d",
+                row_number, x12sheet.rowx, self.explicit_row_number)
+        self.columns = None
+        if x12sheet.column_filter is not None:
+            self.columns = x12sheet.column_filter(self.sheet, self.rowx)
+
+    def get_colx(self, cell_name):
+        # decode the cell name like do_row, including its errors
+        letter_value = _UPPERCASE_1_REL_INDEX
+        colx = 0
+        charx = -1
+        try:
+            for c in cell_name:
+                charx += 1
+                if c == '$':
+                    continue
+                lv = letter_value[c]
+                if lv:
+                    colx = colx * 26 + lv
+                else: # start of row number; can't be '0'
+                    colx = colx - 1
+                    assert 0 <= colx < X12_MAX_COLS
+                    break
+        except KeyError:
+            raise Exception('Unexpected character %r in cell name %r' % (c, cell_name))
+        if self.explicit_row_number and cell_name[charx:] != self.row_number:
+            raise Exception('cell name %r but row number is %r' % (cell_name, self.row_number))
+        letters = cell_name[:charx]
+        if letters.isalpha():
+            self.colx_from_letters[letters] = colx
+        return colx
+
+    def end_cell(self):
+        cell_type = self.cell_type
+        tvalue = self.tvalue
+        if cell_type == 's':
+            # the most frequent type after n
+            if tvalue:
+                self.put_cell(self.rowx, self.colx, XL_CELL_TEXT, self.sst[int(tvalue)], self.xf_index)
+                return
+        elif cell_type == 'n':
+            if tvalue:
+                self.put_cell(self.rowx, self.colx, None, float(tvalue), self.xf_index)
+                return
+        elif cell_type == 'str':
+            self.put_cell(self.rowx, self.colx, XL_CELL_TEXT, tvalue, self.xf_index)
+            return
+        elif cell_type == 'b':
+            self.put_cell(self.rowx, self.colx, XL_CELL_BOOLEAN, cnv_xsd_boolean(tvalue), self.xf_index)
+            return
+        elif cell_type == 'e':
+            self.put_cell(self.rowx, self.colx, XL_CELL_ERROR, error_code_from_text[tvalue], self.xf_index)
+            return
+        elif cell_type == 'inlineStr':
+            if tvalue:
+                self.put_cell(self.rowx, self.colx, XL_CELL_TEXT, tvalue, self.xf_index)
+                return
+        elif cell_type is None:
+            return # not in the columns of the row
+        else:
+            raise Exception("Unknown cell type %r in rowx=%d colx=%d" % (cell_type, self.rowx, self.colx))
+        # n, s or inlineStr without a value
+        if self.bk.formatting_info:
+            self.put_cell(self.rowx, self.colx, XL_CELL_BLANK, '', self.xf_index)
+
+# The Book and X12Book attributes that a sheet_jobs worker process needs to
+# parse worksheets, set up by _init_sheet_worker.
+_SHEET_WORKER_BOOK_ATTRS = (
+    'verbosity', 'formatting_info', 'ragged_rows', 'compact_cells', 'preallocate_cells',
+    'column_filter', 'datemode', 'biff_version', 'nsheets', '_sheet_names',
+    '_sheet_visibility', '_xf_index_to_xl_type_map', '_sharedstrings',
+)
+_SHEET_WORKER_LOADER_ATTRS = (
+    'sheet_targets', 'use_expat', 'max_rows', 'stop_row', 'detach_rows',
+    'minimal_metadata',
+)
+
+# Sheet attributes that refer to the book or the cells, they are not sent
+# back from a worker process; _unpack_sheet sets them up again.
+_SHEET_LOCAL_ATTRS = frozenset([
+    'book', 'logfile', 'put_cell', '_xf_index_to_xl_type_map', '_cell_store',
+    '_cell_values', '_cell_types', '_cell_xf_indexes', 'merged_cells',
+    '_merged_cell_map', '_merged_big_ranges', '_merged_col_index', '_preallocated',
+])
+
+_sheet_worker = None # the X12Book of a sheet_jobs worker process
+
+def _init_sheet_worker(filename, component_names, book_attrs, loader_attrs):
+    global _sheet_worker
+    bk = Book()
+    bk.logfile = DLF
+    x12book = X12Book(bk, DLF, book_attrs['verbosity'])
+    bk.__dict__.update(book_attrs)
+    bk._sheet_list = [None] * bk.nsheets
+    x12book.__dict__.update(loader_attrs)
+    x12book.zf = zipfile.ZipFile(filename)
+    x12book.component_names = component_names
+    _sheet_worker = x12book
+
+def _load_sheet_worker(sheetx):
+    sheet = _sheet_worker.get_sheet(sheetx)
+    _sheet_worker.bk._sheet_list[sheetx] = None
+    return _pack_sheet(sheet)
+
+def _pack_sheet(sheet):
+    """
+    Returns the parsed state of a sheet as plain values, the cell lists or
+    arrays are kept as they are. Equal strings are pickled once.
+    """
+    attrs = dict((name, value) for name, value in sheet.__dict__.items()
+                 if name not in _SHEET_LOCAL_ATTRS)
+    if sheet.compact_cells:
+        store = sheet._cell_store
+        cells = (store.col_types, store.col_numbers, store.col_objects,
+                 store.col_xf_indexes, store.row_lens)
+    else:
+        cells = (sheet._cell_values, sheet._cell_types, sheet._cell_xf_indexes)
+    return attrs, cells, sheet.merged_cells
+
+def _unpack_sheet(bk, sheetx, packed):
+    attrs, cells, merged_cells = packed
+    sheet = Sheet(bk, position=None, name=bk._sheet_names[sheetx], number=sheetx)
+    sheet.__dict__.update(attrs)
+    if sheet.compact_cells:
+        store = sheet._cell_store
+        (store.col_types, store.col_numbers, store.col_objects,
+         store.col_xf_indexes, store.row_lens) = cells
+    else:
+        sheet._cell_values, sheet._cell_types, sheet._cell_xf_indexes = cells
+    for crange in merged_cells:
+        sheet.put_merged_range(crange)
+    bk._sheet_list[sheetx] = sheet
+    return sheet
+
+def _load_sheets_parallel(x12book, sheetxs, sheet_jobs):
+    """
+    Parses the worksheets ``sheetxs`` in a pool of ``sheet_jobs`` processes
+    and puts them in the book. The shared strings and styles are already
+    loaded; each process opens the zip file again.
+    """
+    bk = x12book.bk
+    book_attrs = dict((name, getattr(bk, name)) for name in _SHEET_WORKER_BOOK_ATTRS)
+    loader_attrs = dict((name, getattr(x12book, name)) for name in _SHEET_WORKER_LOADER_ATTRS)
+    initargs = (x12book.zf.filename, x12book.component_names, book_attrs, loader_attrs)
+    pool = multiprocessing.Pool(min(sheet_jobs, len(sheetxs)), _init_sheet_worker, initargs)
+    try:
+        for sheetx, packed in zip(sheetxs, pool.imap(_load_sheet_worker, sheetxs)):
+            _unpack_sheet(bk, sheetx, packed)
+    finally:
+        pool.terminate()
+
 def open_workbook_2007_xml(zf,
                            component_names,
                            logfile=sys.stdout,
@@ -788,7 +1475,18 @@ def open_workbook_2007_xml(zf,
                            use_mmap=0,
                            formatting_info=0,
                            on_demand=0,
-                           ragged_rows=0):
+                           ragged_rows=0,
+                           sheet_filter=None,
+                           lazy_sst=False,
+                           use_expat=False,
+                           max_rows=None,
+                           stop_row=None,
+                           column_filter=None,
+                           compact_cells=False,
+                           sheet_jobs=None,
+                           minimal_metadata=False,
+                           preallocate_cells=False,
+                           detach_rows=False):
     ensure_elementtree_imported(verbosity, logfile)
     bk = Book()
     bk.logfile = logfile
@@ -798,13 +1496,20 @@ def open_workbook_2007_xml(zf,
         raise NotImplementedError("formatting_info=True not yet implemented")
     bk.use_mmap = False #### Not supported initially
     bk.on_demand = on_demand
-    if on_demand:
-        if verbosity:
-            print("WARNING *** on_demand=True not yet implemented; falling back to False", file=bk.logfile)
-        bk.on_demand = False
     bk.ragged_rows = ragged_rows
 
     x12book = X12Book(bk, logfile, verbosity)
+    x12book.zf = zf
+    x12book.component_names = component_names
+    x12book.use_expat = use_expat
+    x12book.max_rows = max_rows
+    x12book.stop_row = stop_row
+    x12book.detach_rows = detach_rows
+    x12book.minimal_metadata = minimal_metadata
+    bk.column_filter = column_filter
+    bk.compact_cells = compact_cells
+    bk.preallocate_cells = preallocate_cells
+    bk._sheet_loader = x12book
     zflo = zf.open(component_names['xl/_rels/workbook.xml.rels'])
     x12book.process_rels(zflo)
     del zflo
@@ -812,49 +1517,42 @@ def open_workbook_2007_xml(zf,
     x12book.process_stream(zflo, 'Workbook')
     del zflo
     props_name = 'docprops/core.xml'
-    if props_name in component_names:
+    if props_name in component_names and not minimal_metadata:
         zflo = zf.open(component_names[props_name])
         x12book.process_coreprops(zflo)
 
     x12sty = X12Styles(bk, logfile, verbosity)
     if 'xl/styles.xml' in component_names:
         zflo = zf.open(component_names['xl/styles.xml'])
-        x12sty.process_stream(zflo, 'styles')
+        if minimal_metadata:
+            x12sty.scan_stream(zflo, 'styles')
+        else:
+            x12sty.process_stream(zflo, 'styles')
         del zflo
     else:
         # seen in MS sample file MergedCells.xlsx
         pass
 
     sst_fname = 'xl/sharedstrings.xml'
-    x12sst = X12SST(bk, logfile, verbosity)
+    if lazy_sst:
+        x12sst = X12LazySST(bk, logfile, verbosity)
+    else:
+        x12sst = X12SST(bk, logfile, verbosity)
     if sst_fname in component_names:
         zflo = zf.open(component_names[sst_fname])
         x12sst.process_stream(zflo, 'SST')
         del zflo
 
-    for sheetx in range(bk.nsheets):
-        fname = x12book.sheet_targets[sheetx]
-        zflo = zf.open(component_names[fname])
-        sheet = bk._sheet_list[sheetx]
-        x12sheet = X12Sheet(sheet, logfile, verbosity)
-        heading = "Sheet %r (sheetx=%d) from %r" % (sheet.name, sheetx, fname)
-        x12sheet.process_stream(zflo, heading)
-        del zflo
-
-        rels_fname = 'xl/worksheets/_rels/%s.rels' % fname.rsplit('/', 1)[-1]
-        if rels_fname in component_names:
-            zfrels = zf.open(rels_fname)
-            x12sheet.process_rels(zfrels)
-            del zfrels
-
-        for relid, reltype in x12sheet.relid2reltype.items():
-            if reltype == 'comments':
-                comments_fname = x12sheet.relid2path.get(relid)
-                if comments_fname and comments_fname in component_names:
-                    comments_stream = zf.open(comments_fname)
-                    x12sheet.process_comments_stream(comments_stream)
-                    del comments_stream
-
-        sheet.tidy_dimensions()
+    if not on_demand:
+        try:
+            sheetxs = [sheetx for sheetx in range(bk.nsheets)
+                       if sheet_filter is None or sheet_filter(bk._sheet_names[sheetx])]
+            if sheet_jobs and sheet_jobs > 1 and len(sheetxs) > 1 and zf.filename:
+                _load_sheets_parallel(x12book, sheetxs, sheet_jobs)
+            else:
+                for sheetx in sheetxs:
+                    x12book.get_sheet(sheetx)
+        finally:
+            bk.release_resources()
 
     return bk